@@ -11,6 +11,7 @@ SCALEDOWN_BASE_URL = "https://api.scaledown.ai/v1"  # or your custom endpoint
 SCALEDOWN_TIMEOUT = 30  # seconds
 SCALEDOWN_USE_BATCH = True  # Use batch processing when possible
 SCALEDOWN_FALLBACK_TO_LOCAL = True  # Fall back to local processing if API fails
+SCALEDOWN_GZIP_REQUESTS = False  # Gzip large request bodies (only if your endpoint accepts Content-Encoding: gzip)
 
 # Feature Flags
 USE_SCALEDOWN_FOR_COMPRESSION = True
@@ -1,17 +1,49 @@
 """Start the Email Triage Assistant API server"""
 import sys
 import os
+import shutil
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.api.main import app
-import uvicorn
+# Number of worker processes. emails_db/threads_db live in process memory,
+# so every worker sees its own inbox - keep this at 1 until storage moves
+# to a shared backend (Redis/Postgres).
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
 
 if __name__ == "__main__":
+    # Imported here, not at module level: triage pool workers re-import this
+    # script as __mp_main__ and must not build a second app in every process
+    from src.api.main import app, UVICORN_LOOP, UVICORN_HTTP
+    import uvicorn
+    
     print("🚀 Starting Email Triage Assistant API Server...")
     print("📍 API Docs: http://localhost:8000/docs")
     print("🌐 Dashboard: http://localhost:8000")
+    print(f"⚙️  Event loop: {UVICORN_LOOP}, HTTP parser: {UVICORN_HTTP}")
+    
+    if WORKERS > 1 and shutil.which("gunicorn"):
+        # Pre-forked uvicorn workers supervised by gunicorn (one per core)
+        print(f"⚙️  Workers: {WORKERS} (gunicorn)")
+        print("\nPress CTRL+C to stop the server\n")
+        os.execvp("gunicorn", [
+            "gunicorn",
+            "-k", "uvicorn.workers.UvicornWorker",
+            "-w", str(WORKERS),
+            "-b", "0.0.0.0:8000",
+            "src.api.main:app"
+        ])
+    
+    if WORKERS > 1:
+        print("⚠️ gunicorn not installed, starting a single worker")
     print("\nPress CTRL+C to stop the server\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        log_level="warning",
+        access_log=False
+    )
@@ -2,50 +2,90 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
-from typing import List, Optional
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
+from typing import Dict, List, Optional
+from collections import Counter
+from operator import itemgetter
+import bisect
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import os
+import threading
+import orjson
 import uvicorn
 from datetime import datetime
 
 from ..models import Email, EmailThread, EmailCategory, Priority
-from ..ingestion import MockEmailGenerator, GmailIngestor, OutlookIngestor, IMAPIngestor
-from ..triage import TriageAgent, RuleBasedClassifier
-from ..priority import PriorityScorer
+from .. import ingestion
+from ..ingestion import MockEmailGenerator
 from ..compression import EmailThreadCompressor
 from ..config import Config
 from .scaledown_integration import ScaleDownAPIClient, HybridCompressor
+from .triage_worker import triage_chunk, create_pool
+
+# Prefer the uvloop event loop and httptools parser (uvicorn[standard]);
+# uvloop is not available on Windows, so fall back to the pure-Python stack
+try:
+    import uvloop  # noqa: F401
+    import httptools  # noqa: F401
+    UVICORN_LOOP, UVICORN_HTTP = "uvloop", "httptools"
+except ImportError:
+    UVICORN_LOOP, UVICORN_HTTP = "asyncio", "h11"
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Email Triage Assistant API",
     description="Automated email management with AI-powered triage and compression",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Compress large JSON payloads (email lists, thread detail); small responses
+# are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Add CORS middleware (added last so it is outermost and answers preflights
+# before compression/routing). Browsers reject credentials with a wildcard
+# origin, so origins are listed explicitly; override with CORS_ORIGINS
+# (comma-separated). Preflight results are cached for a day.
+CORS_ORIGINS = os.environ.get(
+    "CORS_ORIGINS", "http://localhost:8000,http://127.0.0.1:8000"
+).split(",")
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[origin.strip() for origin in CORS_ORIGINS if origin.strip()],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Initialize components
 mock_generator = MockEmailGenerator()
-triage_agent = TriageAgent()
-priority_scorer = PriorityScorer()
+mock_generator_lock = threading.Lock()
 local_compressor = EmailThreadCompressor()
 
+# Configuration is fixed for the lifetime of the process, so resolve it once
+SCALEDOWN_CONFIGURED = Config.is_scaledown_configured()
+SCALEDOWN_BASE_URL = Config.SCALEDOWN_BASE_URL
+SCALEDOWN_FEATURES = {
+    "compression": Config.USE_SCALEDOWN_FOR_COMPRESSION,
+    "classification": Config.USE_SCALEDOWN_FOR_CLASSIFICATION,
+    "responses": Config.USE_SCALEDOWN_FOR_RESPONSES
+}
+
 # Initialize ScaleDown AI client if configured
 scaledown_client = None
-if Config.is_scaledown_configured():
+if SCALEDOWN_CONFIGURED:
     scaledown_client = ScaleDownAPIClient(
         api_key=Config.SCALEDOWN_API_KEY,
-        base_url=Config.SCALEDOWN_BASE_URL
+        base_url=SCALEDOWN_BASE_URL,
+        gzip_requests=getattr(Config, "SCALEDOWN_GZIP_REQUESTS", False)
     )
-    print(f"✅ ScaleDown AI API configured: {Config.SCALEDOWN_BASE_URL}")
+    print(f"✅ ScaleDown AI API configured: {SCALEDOWN_BASE_URL}")
 else:
     print("⚠️ ScaleDown AI API not configured. Using local processing only.")
 
@@ -55,15 +95,20 @@ compressor = HybridCompressor(
     local_compressor=local_compressor
 )
 
-# In-memory storage (for demo - replace with database in production)
-emails_db: List[Email] = []
-threads_db: List[EmailThread] = []
+# Static pages are built once at import time rather than per request.
+# Set DASHBOARD_RELOAD=1 to re-read frontend.html on every hit while editing it.
+FRONTEND_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend.html')
+DASHBOARD_RELOAD = os.environ.get("DASHBOARD_RELOAD", "").lower() in ("1", "true", "yes")
 
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Root endpoint with welcome page"""
-    return """
+def _read_dashboard() -> bytes:
+    with open(FRONTEND_PATH, 'rb') as f:
+        return f.read()
+
+
+DASHBOARD_HTML = _read_dashboard()
+
+ROOT_HTML = """
     <html>
         <head>
             <title>Email Triage Assistant</title>
@@ -154,13 +199,254 @@ async def root():
     """
 
 
+# Emails are triaged in chunks on a process pool so CPU-bound classification
+# and scoring use every core and never block the event loop. The pool lives
+# for the duration of the app lifespan (created on startup) and gets this
+# server worker's share of the cores: WEB_CONCURRENCY is the number of
+# server worker processes, as in run_server.py.
+PROCESS_CHUNK_SIZE = 256
+SERVER_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+process_pool: Optional[ProcessPoolExecutor] = None
+
+# Concurrent /api/batch/process callers are coalesced into one upstream
+# ScaleDown request, flushed at BATCH_MAX_EMAILS or after BATCH_MAX_WAIT seconds
+BATCH_MAX_EMAILS = 64
+BATCH_MAX_WAIT = 0.05
+batch_queue: Optional[asyncio.Queue] = None
+batch_worker_task: Optional[asyncio.Task] = None
+
+# Query-string -> enum lookups for the /api/emails filters
+CATEGORY_BY_VALUE: Dict[str, EmailCategory] = {c.value: c for c in EmailCategory}
+PRIORITY_BY_NAME: Dict[str, Priority] = {p.name: p for p in Priority}
+
+# In-memory storage (for demo - replace with database in production)
+emails_db: List[Email] = []
+threads_db: List[EmailThread] = []
+
+# Held by every endpoint that mutates the store (ingest, process, reset) so
+# one that awaits partway through never interleaves with another
+store_lock = asyncio.Lock()
+
+# Lookup indices kept in sync with the lists above
+emails_by_id: Dict[str, Email] = {}
+threads_by_id: Dict[str, EmailThread] = {}
+
+# Running aggregates for /api/stats and /api/metrics, updated as emails are
+# stored and processed so those endpoints never rescan the inbox
+category_counts: Counter = Counter()
+priority_counts: Counter = Counter()
+response_required_count = 0
+compressed_thread_count = 0
+compression_ratio_sum = 0.0
+
+# /api/emails/categorized payload: category -> email summaries sorted by
+# descending priority. Maintained on ingest/triage instead of per request.
+categorized_view: Dict[str, List[dict]] = {}
+
+# compressor.get_compression_stats() per thread id, computed when the thread
+# is compressed and served from here by the detail endpoint
+thread_stats_cache: Dict[str, dict] = {}
+
+# Serialized Email.to_dict() per email id, so list endpoints splice cached
+# JSON instead of re-encoding every email. Dropped when triage updates an email.
+email_json_cache: Dict[str, bytes] = {}
+
+# Secondary indices for /api/emails filters, each bucket in emails_db order
+emails_by_category: Dict[Optional[EmailCategory], List[Email]] = {}
+emails_by_priority: Dict[Optional[Priority], List[Email]] = {}
+emails_by_category_priority: Dict[tuple, List[Email]] = {}
+
+
+def _email_summary(email: Email) -> dict:
+    """Compact per-email entry used by the categorized view"""
+    return {
+        'id': email.id,
+        'subject': email.subject,
+        'sender': email.sender.email,
+        'priority_score': email.priority_score,
+        'priority_level': email.priority_level.name if email.priority_level else None,
+        'received_at': email.received_at,
+        'requires_response': email.requires_response
+    }
+
+
+def _email_json(email: Email) -> bytes:
+    """Return the cached JSON encoding of email.to_dict()"""
+    encoded = email_json_cache.get(email.id)
+    if encoded is None:
+        encoded = email_json_cache[email.id] = orjson.dumps(email.to_dict())
+    return encoded
+
+
+def _bucket_email(email: Email):
+    """Append an email to the category/priority filter buckets"""
+    emails_by_category.setdefault(email.category, []).append(email)
+    emails_by_priority.setdefault(email.priority_level, []).append(email)
+    emails_by_category_priority.setdefault(
+        (email.category, email.priority_level), []
+    ).append(email)
+
+
+def _add_to_email_views(email: Email):
+    """Index a newly stored email in the categorized view and filter buckets"""
+    cat = email.category.value if email.category else 'uncategorized'
+    bisect.insort(
+        categorized_view.setdefault(cat, []),
+        _email_summary(email),
+        key=lambda e: -e['priority_score']
+    )
+    _bucket_email(email)
+
+
+def _rebuild_email_views():
+    """Regroup every stored email (after triage moved emails between categories)"""
+    categorized_view.clear()
+    emails_by_category.clear()
+    emails_by_priority.clear()
+    emails_by_category_priority.clear()
+    for email in emails_db:
+        cat = email.category.value if email.category else 'uncategorized'
+        categorized_view.setdefault(cat, []).append(_email_summary(email))
+        _bucket_email(email)
+    for summaries in categorized_view.values():
+        summaries.sort(key=itemgetter('priority_score'), reverse=True)
+
+
+def _count_email(email: Email, delta: int = 1):
+    """Add (or with delta=-1, remove) an email's contribution to the aggregates"""
+    global response_required_count
+    category_counts[email.category.value if email.category else 'uncategorized'] += delta
+    priority_counts[email.priority_level.name if email.priority_level else 'UNASSIGNED'] += delta
+    if email.requires_response:
+        response_required_count += delta
+
+
+def _count_compressed_thread(thread: EmailThread):
+    """Record a compressed thread in the aggregates"""
+    global compressed_thread_count, compression_ratio_sum
+    compressed_thread_count += 1
+    compression_ratio_sum += thread.compression_ratio
+
+
+def _store_emails(new_emails: List[Email]):
+    """Append emails to the in-memory store and index them by id"""
+    emails_db.extend(new_emails)
+    emails_by_id.update((e.id, e) for e in new_emails)
+    for email in new_emails:
+        _count_email(email)
+        _add_to_email_views(email)
+
+
+def _store_threads(new_threads: List[EmailThread]):
+    """Append threads to the in-memory store and index them by id"""
+    threads_db.extend(new_threads)
+    threads_by_id.update((t.thread_id, t) for t in new_threads)
+    for thread in new_threads:
+        if thread.compressed_summary:
+            _count_compressed_thread(thread)
+
+
+async def _batch_worker():
+    """
+    Merge queued batch requests and resolve each caller with its own results
+    
+    The merged emails go upstream in sub-batches of at most the client's
+    BATCH_CHUNK_SIZE, keeping each caller's emails together where they fit.
+    Results are matched back by the "id" field sent for each email, never
+    by position, and a sub-batch that raises only fails the callers with
+    an email in it.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        pending = [await batch_queue.get()]
+        size = len(pending[0][0])
+        deadline = loop.time() + BATCH_MAX_WAIT
+        
+        # Keep collecting until the batch is full or the wait budget is spent
+        while size < BATCH_MAX_EMAILS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(batch_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item[0])
+        
+        # Emails requested by more than one caller are only sent once
+        chunk_size = scaledown_client.BATCH_CHUNK_SIZE
+        chunks: List[List[Email]] = [[]]
+        seen = set()
+        for emails, _ in pending:
+            fresh = [email for email in emails if email.id not in seen]
+            seen.update(email.id for email in fresh)
+            if chunks[-1] and len(chunks[-1]) + len(fresh) > chunk_size:
+                chunks.append([])
+            for email in fresh:
+                if len(chunks[-1]) >= chunk_size:
+                    chunks.append([])
+                chunks[-1].append(email)
+        chunks = [chunk for chunk in chunks if chunk]
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(None, scaledown_client.batch_process, chunk)
+              for chunk in chunks),
+            return_exceptions=True
+        )
+        
+        results_by_id: Dict[str, dict] = {}
+        errors_by_id: Dict[str, BaseException] = {}
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, BaseException):
+                errors_by_id.update((email.id, outcome) for email in chunk)
+                continue
+            for result in outcome:
+                if isinstance(result, dict) and 'id' in result:
+                    results_by_id[result['id']] = result
+        
+        for emails, future in pending:
+            if future.done():
+                continue
+            error = next((errors_by_id[e.id] for e in emails if e.id in errors_by_id), None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result([results_by_id[e.id] for e in emails if e.id in results_by_id])
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global batch_queue, batch_worker_task, process_pool
+    process_pool = create_pool(SERVER_WORKERS)
+    if scaledown_client:
+        batch_queue = asyncio.Queue()
+        batch_worker_task = asyncio.create_task(_batch_worker())
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    global process_pool
+    if batch_worker_task:
+        batch_worker_task.cancel()
+    if process_pool:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+        process_pool = None
+    if scaledown_client:
+        scaledown_client.close()
+
+
+@app.get("/", response_class=HTMLResponse)
+async def root():
+    """Root endpoint with welcome page"""
+    return HTMLResponse(ROOT_HTML)
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard():
     """Serve the email dashboard UI"""
-    import os
-    frontend_path = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend.html')
-    with open(frontend_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    if DASHBOARD_RELOAD:
+        return HTMLResponse(_read_dashboard())
+    return HTMLResponse(DASHBOARD_HTML)
 
 
 @app.get("/api/stats")
@@ -169,29 +455,36 @@ async def get_stats():
     return {
         "total_emails": len(emails_db),
         "total_threads": len(threads_db),
-        "categorized_emails": sum(1 for e in emails_db if e.category is not None),
-        "emails_requiring_response": sum(1 for e in emails_db if e.requires_response)
+        "categorized_emails": len(emails_db) - category_counts['uncategorized'],
+        "emails_requiring_response": response_required_count
     }
 
 
+def _generate_mock_data(count: int) -> tuple:
+    """Generate a batch of emails plus a few threads (runs in a worker thread)"""
+    # The generator's Faker/random state is shared, so serialize callers
+    with mock_generator_lock:
+        new_emails = mock_generator.generate_batch(count)
+        new_threads = [
+            mock_generator.generate_thread(message_count=50)
+            for _ in range(5)
+        ]
+    return new_emails, new_threads
+
+
 @app.post("/api/generate-mock-data")
 async def generate_mock_data(count: int = 100):
     """Generate mock email data for testing"""
-    global emails_db, threads_db
-    
-    # Generate emails
-    new_emails = mock_generator.generate_batch(count)
-    emails_db.extend(new_emails)
-    
-    # Generate a few threads
-    new_threads = []
-    for i in range(5):
-        thread = mock_generator.generate_thread(message_count=50)
-        new_threads.append(thread)
-        # Add thread messages to emails_db
-        emails_db.extend(thread.messages)
-    
-    threads_db.extend(new_threads)
+    # Faker generation is CPU-heavy; run it in a worker thread
+    new_emails, new_threads = await asyncio.to_thread(_generate_mock_data, count)
+    
+    async with store_lock:
+        _store_emails(new_emails)
+        for thread in new_threads:
+            # Add thread messages to emails_db
+            _store_emails(thread.messages)
+        
+        _store_threads(new_threads)
     
     return {
         "status": "success",
@@ -205,27 +498,51 @@ async def generate_mock_data(count: int = 100):
 @app.post("/api/process-inbox")
 async def process_inbox():
     """Process all emails in inbox (triage + prioritize)"""
-    processed_count = 0
-    
-    for email in emails_db:
-        # Skip already processed emails
-        if email.category and email.priority_score > 0:
-            continue
-        
-        # Triage
-        email = triage_agent.classify_email(email)
-        
-        # Calculate priority
-        email.priority_score = priority_scorer.calculate_priority(email)
-        email.priority_level = priority_scorer.assign_priority_level(email.priority_score)
-        
-        processed_count += 1
+    async with store_lock:
+        return await _process_inbox()
+
+
+async def _process_inbox() -> dict:
+    """process_inbox body; the caller holds store_lock across its awaits"""
+    # Skip already processed emails
+    pending = [e for e in emails_db if not (e.category and e.priority_score > 0)]
+    chunks = [
+        pending[i:i + PROCESS_CHUNK_SIZE]
+        for i in range(0, len(pending), PROCESS_CHUNK_SIZE)
+    ]
+    
+    # Triage + priority scoring, one chunk per worker task
+    loop = asyncio.get_running_loop()
+    chunk_results = await asyncio.gather(*(
+        loop.run_in_executor(process_pool, triage_chunk, chunk)
+        for chunk in chunks
+    ))
+    
+    for chunk, results in zip(chunks, chunk_results):
+        for email, (category, intent, requires_response, score, level) in zip(chunk, results):
+            # Only apply results to emails that are still stored
+            if emails_by_id.get(email.id) is not email:
+                continue
+            _count_email(email, -1)
+            email_json_cache.pop(email.id, None)
+            email.category = category
+            email.detected_intent = intent
+            email.requires_response = requires_response
+            email.priority_score = score
+            email.priority_level = level
+            _count_email(email)
+    
+    processed_count = sum(emails_by_id.get(email.id) is email for email in pending)
+    if processed_count:
+        _rebuild_email_views()
     
     # Process threads (compression)
     compressed_count = 0
     for thread in threads_db:
         if not thread.compressed_summary:
-            thread = compressor.compress_thread(thread)
+            thread = await asyncio.to_thread(compressor.compress_thread, thread)
+            thread_stats_cache[thread.thread_id] = local_compressor.get_compression_stats(thread)
+            _count_compressed_thread(thread)
             compressed_count += 1
     
     return {
@@ -242,140 +559,125 @@ async def get_emails(
     limit: int = 50
 ):
     """Get emails with optional filtering"""
-    filtered_emails = emails_db
+    cat = pri = None
     
     # Filter by category
     if category:
-        try:
-            cat = EmailCategory(category.lower())
-            filtered_emails = [e for e in filtered_emails if e.category == cat]
-        except ValueError:
+        cat = CATEGORY_BY_VALUE.get(category.lower())
+        if cat is None:
             raise HTTPException(status_code=400, detail=f"Invalid category: {category}")
     
     # Filter by priority
     if priority:
-        try:
-            pri = Priority[priority.upper()]
-            filtered_emails = [e for e in filtered_emails if e.priority_level == pri]
-        except KeyError:
+        pri = PRIORITY_BY_NAME.get(priority.upper())
+        if pri is None:
             raise HTTPException(status_code=400, detail=f"Invalid priority: {priority}")
     
+    # Pick the matching pre-built bucket
+    if cat and pri:
+        filtered_emails = emails_by_category_priority.get((cat, pri), [])
+    elif cat:
+        filtered_emails = emails_by_category.get(cat, [])
+    elif pri:
+        filtered_emails = emails_by_priority.get(pri, [])
+    else:
+        filtered_emails = emails_db
+    
     # Limit results
     filtered_emails = filtered_emails[:limit]
     
-    return {
-        "total": len(filtered_emails),
-        "emails": [e.to_dict() for e in filtered_emails]
-    }
+    # Splice pre-encoded emails straight into the response body, skipping
+    # FastAPI's jsonable_encoder pass over every email dict
+    body = b'{"total":%d,"emails":[%s]}' % (
+        len(filtered_emails),
+        b','.join(_email_json(e) for e in filtered_emails)
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/emails/categorized")
 async def get_categorized_emails():
     """Get emails grouped by category"""
-    categories = {}
-    
-    for email in emails_db:
-        cat = email.category.value if email.category else 'uncategorized'
-        if cat not in categories:
-            categories[cat] = []
-        
-        categories[cat].append({
-            'id': email.id,
-            'subject': email.subject,
-            'sender': email.sender.email,
-            'priority_score': email.priority_score,
-            'priority_level': email.priority_level.name if email.priority_level else None,
-            'received_at': email.received_at.isoformat(),
-            'requires_response': email.requires_response
-        })
-    
-    # Sort each category by priority
-    for cat in categories:
-        categories[cat].sort(key=lambda e: e['priority_score'], reverse=True)
-    
-    return categories
+    return categorized_view
 
 
 @app.get("/api/email/{email_id}")
 async def get_email_detail(email_id: str):
     """Get detailed email information"""
-    email = next((e for e in emails_db if e.id == email_id), None)
+    email = emails_by_id.get(email_id)
     
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
     
     # Find associated thread
-    thread = next((t for t in threads_db if t.thread_id == email.thread_id), None)
+    thread = threads_by_id.get(email.thread_id)
     
-    response = {
-        'email': email.to_dict()
-    }
-    
-    if thread:
-        response['thread'] = {
-            'thread_id': thread.thread_id,
-            'message_count': thread.message_count,
-            'compressed_summary': thread.compressed_summary,
-            'key_decisions': thread.key_decisions,
-            'unresolved_questions': thread.unresolved_questions,
-            'action_items': thread.action_items_by_person,
-            'compression_stats': compressor.get_compression_stats(thread) if thread.compressed_summary else None
-        }
+    if not thread:
+        return Response(content=b'{"email":%s}' % _email_json(email), media_type="application/json")
     
-    return response
+    thread_info = orjson.dumps({
+        'thread_id': thread.thread_id,
+        'message_count': thread.message_count,
+        'compressed_summary': thread.compressed_summary,
+        'key_decisions': thread.key_decisions,
+        'unresolved_questions': thread.unresolved_questions,
+        'action_items': thread.action_items_by_person,
+        'compression_stats': thread_stats_cache.get(thread.thread_id) if thread.compressed_summary else None
+    })
+    return Response(content=b'{"email":%s,"thread":%s}' % (_email_json(email), thread_info),
+                    media_type="application/json")
 
 
 @app.get("/api/threads")
 async def get_threads(limit: int = 20):
     """Get email threads with compression stats"""
     limited_threads = threads_db[:limit]
+    total = len(threads_db)
     
-    return {
-        "total": len(threads_db),
-        "threads": [
-            {
+    async def stream():
+        # Encode and send one thread at a time instead of building the list
+        yield b'{"total":%d,"threads":[' % total
+        for i, t in enumerate(limited_threads):
+            yield (b',' if i else b'') + orjson.dumps({
                 'thread_id': t.thread_id,
                 'subject': t.subject,
                 'message_count': t.message_count,
                 'participants': [p.to_dict() for p in t.participants],
-                'first_message': t.first_message_at.isoformat() if t.first_message_at else None,
-                'last_message': t.last_message_at.isoformat() if t.last_message_at else None,
+                'first_message': t.first_message_at,
+                'last_message': t.last_message_at,
                 'compression_ratio': round(t.compression_ratio, 2),
                 'compressed': t.compressed_summary is not None
-            }
-            for t in limited_threads
-        ]
-    }
+            })
+        yield b']}'
+    
+    return StreamingResponse(stream(), media_type="application/json")
 
 
 @app.get("/api/thread/{thread_id}")
 async def get_thread_detail(thread_id: str):
     """Get detailed thread information with full compression"""
-    thread = next((t for t in threads_db if t.thread_id == thread_id), None)
+    thread = threads_by_id.get(thread_id)
     
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    return thread.to_dict()
+    # Thread fields encoded once; messages spliced from the per-email JSON cache
+    body = b'%s,"messages":[%s]}' % (
+        orjson.dumps(thread.to_dict(include_messages=False))[:-1],
+        b','.join(_email_json(m) for m in thread.messages)
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/metrics")
 async def get_metrics():
     """Get productivity metrics"""
     total = len(emails_db)
-    processed = sum(1 for e in emails_db if e.category is not None)
+    processed = total - category_counts['uncategorized']
     
-    # Calculate category distribution
-    category_dist = {}
-    for email in emails_db:
-        cat = email.category.value if email.category else 'uncategorized'
-        category_dist[cat] = category_dist.get(cat, 0) + 1
-    
-    # Calculate priority distribution
-    priority_dist = {}
-    for email in emails_db:
-        pri = email.priority_level.name if email.priority_level else 'UNASSIGNED'
-        priority_dist[pri] = priority_dist.get(pri, 0) + 1
+    # Distributions come from the running counters (drop emptied buckets)
+    category_dist = {cat: n for cat, n in category_counts.items() if n}
+    priority_dist = {pri: n for pri, n in priority_counts.items() if n}
     
     # Calculate time savings (baseline: 3 min/email, automated: 5 sec/email)
     manual_time_hours = (processed * 180) / 3600  # 180 seconds = 3 minutes
@@ -391,11 +693,10 @@ async def get_metrics():
         'inbox_zero_rate': 0,  # Would be calculated from user data
         'category_distribution': category_dist,
         'priority_distribution': priority_dist,
-        'threads_compressed': sum(1 for t in threads_db if t.compressed_summary),
+        'threads_compressed': compressed_thread_count,
         'avg_compression_ratio': round(
-            sum(t.compression_ratio for t in threads_db if t.compressed_summary) / 
-            len([t for t in threads_db if t.compressed_summary])
-            if any(t.compressed_summary for t in threads_db) else 0,
+            compression_ratio_sum / compressed_thread_count
+            if compressed_thread_count else 0,
             2
         )
     }
@@ -404,13 +705,32 @@ async def get_metrics():
 @app.post("/api/reset")
 async def reset_database():
     """Reset database (clear all data)"""
-    global emails_db, threads_db
-    emails_db = []
-    threads_db = []
+    async with store_lock:
+        _reset_store()
     
     return {"status": "success", "message": "Database cleared"}
 
 
+def _reset_store():
+    """Clear every store, index and aggregate (caller holds store_lock)"""
+    global response_required_count, compressed_thread_count, compression_ratio_sum
+    emails_db.clear()
+    threads_db.clear()
+    emails_by_id.clear()
+    threads_by_id.clear()
+    category_counts.clear()
+    priority_counts.clear()
+    categorized_view.clear()
+    email_json_cache.clear()
+    thread_stats_cache.clear()
+    emails_by_category.clear()
+    emails_by_priority.clear()
+    emails_by_category_priority.clear()
+    response_required_count = 0
+    compressed_thread_count = 0
+    compression_ratio_sum = 0.0
+
+
 @app.post("/api/ingest/gmail")
 async def ingest_gmail(max_emails: int = 50, unread_only: bool = False):
     """
@@ -420,23 +740,22 @@ async def ingest_gmail(max_emails: int = 50, unread_only: bool = False):
     - max_emails: Maximum number of emails to fetch
     - unread_only: Fetch only unread emails
     """
-    global emails_db
-    
-    if not GmailIngestor:
+    if not ingestion.GmailIngestor:
         raise HTTPException(
             status_code=503, 
             detail="Gmail integration not available. Install: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client"
         )
     
     try:
-        ingestor = GmailIngestor()
+        ingestor = ingestion.GmailIngestor()
         
         if unread_only:
             new_emails = ingestor.fetch_unread_emails(max_results=max_emails)
         else:
             new_emails = ingestor.fetch_emails(max_results=max_emails)
         
-        emails_db.extend(new_emails)
+        async with store_lock:
+            _store_emails(new_emails)
         
         return {
             "status": "success",
@@ -464,23 +783,22 @@ async def ingest_outlook(
     - max_emails: Maximum number of emails to fetch
     - unread_only: Fetch only unread emails
     """
-    global emails_db
-    
-    if not OutlookIngestor:
+    if not ingestion.OutlookIngestor:
         raise HTTPException(
             status_code=503,
             detail="Outlook integration not available. Install: pip install msal"
         )
     
     try:
-        ingestor = OutlookIngestor(client_id=client_id)
+        ingestor = ingestion.OutlookIngestor(client_id=client_id)
         
         if unread_only:
             new_emails = ingestor.fetch_unread_emails(max_results=max_emails)
         else:
             new_emails = ingestor.fetch_emails(max_results=max_emails)
         
-        emails_db.extend(new_emails)
+        async with store_lock:
+            _store_emails(new_emails)
         
         return {
             "status": "success",
@@ -498,9 +816,9 @@ async def ingest_outlook(
 async def get_ingestion_status():
     """Check which email ingestion methods are available"""
     return {
-        "gmail_available": GmailIngestor is not None,
-        "outlook_available": OutlookIngestor is not None,
-        "imap_available": IMAPIngestor is not None,
+        "gmail_available": ingestion.GmailIngestor is not None,
+        "outlook_available": ingestion.OutlookIngestor is not None,
+        "imap_available": ingestion.IMAPIngestor is not None,
         "mock_available": True,
         "instructions": {
             "gmail": "Install: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client",
@@ -533,16 +851,14 @@ async def ingest_imap(
     - Outlook: Generate App Password at account.microsoft.com/security
     - Yahoo: Generate App Password at login.yahoo.com/account/security
     """
-    global emails_db
-    
-    if not IMAPIngestor:
+    if not ingestion.IMAPIngestor:
         raise HTTPException(
             status_code=503,
             detail="IMAP not available (should always be available - check installation)"
         )
     
     try:
-        ingestor = IMAPIngestor(
+        ingestor = ingestion.IMAPIngestor(
             email_address=email_address,
             password=password,
             provider=provider
@@ -554,7 +870,8 @@ async def ingest_imap(
             new_emails = ingestor.fetch_emails(max_results=max_emails)
         
         ingestor.disconnect()
-        emails_db.extend(new_emails)
+        async with store_lock:
+            _store_emails(new_emails)
         
         return {
             "status": "success",
@@ -579,16 +896,14 @@ async def get_scaledown_status():
             "message": "ScaleDown AI API not configured. Add SCALEDOWN_API_KEY to config."
         }
     
-    healthy = scaledown_client.health_check()
+    # The client probes /health in the background; report its latest result
+    checked_at = scaledown_client.health_checked_at
     return {
         "configured": True,
-        "healthy": healthy,
-        "base_url": Config.SCALEDOWN_BASE_URL,
-        "features": {
-            "compression": Config.USE_SCALEDOWN_FOR_COMPRESSION,
-            "classification": Config.USE_SCALEDOWN_FOR_CLASSIFICATION,
-            "responses": Config.USE_SCALEDOWN_FOR_RESPONSES
-        }
+        "healthy": checked_at is not None and scaledown_client.is_healthy,
+        "checked_at": checked_at,
+        "base_url": SCALEDOWN_BASE_URL,
+        "features": SCALEDOWN_FEATURES
     }
 
 
@@ -599,12 +914,14 @@ async def generate_response(email_id: str, context: Optional[str] = None):
         raise HTTPException(status_code=503, detail="ScaleDown AI not configured")
     
     # Find email
-    email = next((e for e in emails_db if e.id == email_id), None)
+    email = emails_by_id.get(email_id)
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
     
     # Generate response
-    response_text = scaledown_client.generate_response(email, context)
+    response_text = await asyncio.to_thread(
+        scaledown_client.generate_response, email, context
+    )
     
     if not response_text:
         raise HTTPException(status_code=500, detail="Failed to generate response")
@@ -612,7 +929,7 @@ async def generate_response(email_id: str, context: Optional[str] = None):
     return {
         "email_id": email_id,
         "generated_response": response_text,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
 
@@ -623,19 +940,22 @@ async def analyze_email(email_id: str):
         raise HTTPException(status_code=503, detail="ScaleDown AI not configured")
     
     # Find email
-    email = next((e for e in emails_db if e.id == email_id), None)
+    email = emails_by_id.get(email_id)
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
     
-    # Get sentiment and entities
-    sentiment = scaledown_client.analyze_sentiment(email.body_text)
-    entities = scaledown_client.extract_entities(email.body_text)
+    # Get sentiment and entities (concurrently, off the event loop). Repeat
+    # analyses of the same body are answered from the client's response cache.
+    sentiment, entities = await asyncio.gather(
+        asyncio.to_thread(scaledown_client.analyze_sentiment, email.body_text),
+        asyncio.to_thread(scaledown_client.extract_entities, email.body_text)
+    )
     
     return {
         "email_id": email_id,
         "sentiment": sentiment,
         "entities": entities,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
 
@@ -645,14 +965,22 @@ async def batch_process_emails(email_ids: List[str]):
     if not scaledown_client:
         raise HTTPException(status_code=503, detail="ScaleDown AI not configured")
     
-    # Find emails
-    emails_to_process = [e for e in emails_db if e.id in email_ids]
+    # Find emails (dict.fromkeys drops duplicate ids, keeping request order)
+    emails_to_process = [
+        emails_by_id[i] for i in dict.fromkeys(email_ids) if i in emails_by_id
+    ]
     
     if not emails_to_process:
         raise HTTPException(status_code=404, detail="No emails found")
     
-    # Batch process
-    results = scaledown_client.batch_process(emails_to_process)
+    # Batch process (coalesced with other in-flight callers). Without the
+    # startup hook there is no worker, so call the API directly.
+    if batch_queue is None:
+        results = await asyncio.to_thread(scaledown_client.batch_process, emails_to_process)
+    else:
+        future = asyncio.get_running_loop().create_future()
+        await batch_queue.put((emails_to_process, future))
+        results = await future
     
     return {
         "processed": len(results),
@@ -664,4 +992,12 @@ if __name__ == "__main__":
     print("🚀 Starting Email Triage Assistant API Server...")
     print("📍 API Docs: http://localhost:8000/docs")
     print("🌐 Dashboard: http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        log_level="warning",
+        access_log=False
+    )
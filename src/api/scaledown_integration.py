@@ -3,28 +3,356 @@ ScaleDown AI API Integration Module
 Connects to your custom ScaleDown AI API for enhanced email processing
 """
 
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional, List
 from ..models import Email, EmailThread
 
 
+class _RateLimitFilter(logging.Filter):
+    """
+    Let each distinct message through at most once per interval seconds
+    
+    Called from every thread that logs through this module (API executor,
+    batch workers, health probe), so the bookkeeping is locked.
+    """
+    
+    # Remembered messages before stale ones are pruned
+    MAX_KEYS = 1024
+    
+    def __init__(self, interval: float = 1.0):
+        super().__init__()
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = record.getMessage()
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last.get(key, float("-inf")) < self.interval:
+                return False
+            if len(self._last) >= self.MAX_KEYS:
+                self._last = {k: t for k, t in self._last.items() if now - t < self.interval}
+            self._last[key] = now
+            return True
+
+
+# Repeated errors during an outage are rate limited at the logger, so the
+# limit applies before records propagate. Handlers, formatting and where
+# the output goes (a QueueHandler for off-thread writes, a file, ...) are
+# left to the application's logging configuration.
+logger = logging.getLogger(__name__)
+logger.addFilter(_RateLimitFilter())
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for upstream API calls
+    
+    Opens after failure_threshold consecutive failures, rejects calls for
+    reset_timeout seconds, then lets half_open_probes trial calls through.
+    A successful probe closes the circuit; a failed one re-opens it. Probe
+    slots that have not reported back within reset_timeout are released,
+    so a lost probe cannot hold the circuit half-open forever.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0,
+                 half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open and not yet due a probe)"""
+        return (self.state == self.OPEN and
+                time.monotonic() - self.opened_at < self.reset_timeout)
+    
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    if now - self._probe_started < self.reset_timeout:
+                        return False
+                    self._probes = 0
+                if self._probes == 0:
+                    self._probe_started = now
+                self._probes += 1
+            
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failure_count = 0
+            self._probes = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failure_count += 1
+            if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probes = 0
+
+
 class ScaleDownAPIClient:
     """Client for ScaleDown AI API integration"""
     
-    def __init__(self, api_key: str, base_url: str = "https://api.scaledown.ai/v1"):
+    # (connect, read) timeouts per endpoint: fail fast on unreachable hosts,
+    # give slow-but-healthy responses room. Tune the read side from
+    # latency_percentile() once real traffic has been observed.
+    TIMEOUTS = {
+        "compress": (3.05, 30),
+        "classify": (3.05, 10),
+        "extract": (3.05, 10),
+        "generate": (3.05, 15),
+        "sentiment": (3.05, 10),
+        "batch": (3.05, 10),
+        "health": (2, 5),
+    }
+    
+    # Emails per /batch/process request; larger batches are split and sent concurrently
+    BATCH_CHUNK_SIZE = 100
+    
+    # With gzip_requests enabled, request bodies at least this large are sent
+    # gzip-compressed (opt-in per call)
+    GZIP_MIN_BYTES = 16 * 1024
+    
+    def __init__(self, api_key: str, base_url: str = "https://api.scaledown.ai/v1",
+                 probe_interval: float = 30, gzip_requests: bool = False):
         """
         Initialize ScaleDown AI API client
         
         Args:
             api_key: Your ScaleDown AI API key
             base_url: Base URL for the API (default: https://api.scaledown.ai/v1)
+            probe_interval: Seconds between background health probes
+            gzip_requests: Send large batch/thread bodies with Content-Encoding: gzip.
+                Off by default; only enable it for an endpoint known to accept
+                compressed request bodies.
         """
         self.api_key = api_key
+        self.gzip_requests = gzip_requests
         self.base_url = base_url.rstrip('/')
+        # ACCEPT_ENCODING advertises br (and zstd) only when urllib3 can decode it
         self.headers = {
             "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING
         }
+        
+        # Shared session: keeps TCP/TLS connections alive between API calls
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        
+        # Size the pool for concurrent API callers and retry gateway errors.
+        # Only 502/503/504 answers are retried: a POST that timed out or lost
+        # its connection may already have been processed, so it is not resent.
+        # The analysis endpoints are idempotent, so their POSTs are retried on
+        # those statuses; /generate/response is not, and never is.
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=2,
+                connect=0,
+                read=False,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset({"GET", "POST"})
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Longest mounted prefix wins, so this applies to /generate/ only
+        self.session.mount(f"{self.base_url}/generate/", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=16,
+            max_retries=Retry(total=0, read=False)
+        ))
+        
+        # Stop calling the API during outages instead of waiting on timeouts
+        self.breaker = CircuitBreaker()
+        
+        # Fan-out pool for per-email calls (shares the session's connections)
+        self.executor = ThreadPoolExecutor(max_workers=16)
+        
+        # LRU+TTL cache for the idempotent analysis endpoints. Only successful
+        # responses are stored, so fallbacks are retried on the next call.
+        self.cache_size = 4096
+        self.cache_ttl = 3600
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Thread compressions keyed by thread id + message ids. No TTL: a new
+        # message changes the key, and hits keep serving while the API is down.
+        self.thread_cache_size = 256
+        self._thread_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        
+        # Recent response times per API path, for tuning TIMEOUTS
+        self.latencies: Dict[str, deque] = {}
+        
+        # Health is probed on a daemon thread so nobody blocks on /health.
+        # Assume healthy until the first probe says otherwise; the circuit
+        # breaker covers calls made in the meantime.
+        self.probe_interval = probe_interval
+        self.health_checked_at: Optional[datetime] = None
+        self._healthy = threading.Event()
+        self._healthy.set()
+        self._probe_stop = threading.Event()
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop, name="scaledown-health", daemon=True
+        )
+        self._probe_thread.start()
+    
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self._probe_stop.set()
+        self.executor.shutdown(wait=False)
+        self.session.close()
+        self._cache.clear()
+        self._thread_cache.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: tuple) -> Any:
+        """Return a cached response, or None if missing or expired"""
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return None
+            if hit[1] <= time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return hit[0]
+    
+    def _cache_put(self, key: tuple, value: Any):
+        with self._cache_lock:
+            self._cache[key] = (value, time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def latency_percentile(self, path: str, pct: float = 95) -> Optional[float]:
+        """Response time (seconds) at the given percentile for recent calls to path"""
+        samples = sorted(self.latencies.get(path, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+    
+    def _record_latency(self, path: str, response: requests.Response):
+        samples = self.latencies.get(path)
+        if samples is None:
+            samples = self.latencies.setdefault(path, deque(maxlen=1000))
+        samples.append(response.elapsed.total_seconds())
+    
+    def _post(self, path: str, payload: Dict[str, Any], timeout,
+              compress: bool = False) -> requests.Response:
+        """
+        POST to the API through the circuit breaker
+        
+        Raises CircuitOpenError (a RequestException) without touching the
+        network while the breaker is open. Any exception raised once the
+        breaker has let the call through (connection errors, timeouts, ...)
+        and 5xx responses count as failures. The payload is serialized with
+        orjson before asking the breaker; the session already sends the JSON
+        Content-Type header. With compress=True and gzip_requests enabled,
+        bodies of GZIP_MIN_BYTES or more are gzipped.
+        """
+        body = self._dumps(payload)
+        headers = None
+        if compress and self.gzip_requests and len(body) >= self.GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=6)
+            headers = {"Content-Encoding": "gzip"}
+        
+        if not self.breaker.allow():
+            raise CircuitOpenError("ScaleDown API circuit breaker is open")
+        
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}",
+                data=body,
+                headers=headers,
+                timeout=timeout
+            )
+            self._record_latency(path, response)
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+    
+    @staticmethod
+    def _dumps(payload: Dict[str, Any]) -> bytes:
+        """
+        Serialize a request payload with orjson
+        
+        orjson rejects strings that are not valid UTF-8 (e.g. lone surrogates
+        from badly decoded mail); those payloads go through the stdlib json
+        encoder, which escapes them as requests' json= argument did.
+        """
+        try:
+            return orjson.dumps(payload)
+        except orjson.JSONEncodeError:
+            return json.dumps(payload).encode('utf-8')
+    
+    @staticmethod
+    def _json(response: requests.Response) -> Any:
+        """Decode a JSON response body with orjson"""
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            raise requests.exceptions.InvalidJSONError(str(e), response=response)
     
     def compress_thread(self, thread: EmailThread) -> Dict[str, Any]:
         """
@@ -36,6 +364,23 @@ class ScaleDownAPIClient:
         Returns:
             Dict with compressed summary and extracted information
         """
+        key = hashlib.blake2b(
+            (thread.thread_id + '|' + ','.join(sorted(m.id for m in thread.messages))).encode('utf-8'),
+            digest_size=16
+        ).digest()
+        with self._cache_lock:
+            cached = self._thread_cache.get(key)
+            if cached is not None:
+                self._thread_cache.move_to_end(key)
+                return cached
+        
+        # Don't build the payload just to have _post reject it
+        if self.breaker.is_open:
+            return {
+                "error": "ScaleDown API circuit breaker is open",
+                "fallback": True
+            }
+        
         # Prepare thread data for API
         thread_data = {
             "thread_id": thread.thread_id,
@@ -45,7 +390,7 @@ class ScaleDownAPIClient:
                 {
                     "id": msg.id,
                     "sender": msg.sender.email,
-                    "timestamp": msg.received_at.isoformat(),
+                    "timestamp": msg.received_at_iso,
                     "content": msg.body_text
                 }
                 for msg in thread.messages
@@ -53,21 +398,24 @@ class ScaleDownAPIClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/compress/thread",
-                json=thread_data,
-                headers=self.headers,
-                timeout=30
-            )
+            # Long threads are the largest request bodies we send; gzip them like batches
+            response = self._post("/compress/thread", thread_data,
+                                  timeout=self.TIMEOUTS["compress"], compress=True)
             response.raise_for_status()
-            return response.json()
+            result = self._json(response)
         
         except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
+            logger.warning("ScaleDown API error: %s", e)
             return {
                 "error": str(e),
                 "fallback": True
             }
+        
+        with self._cache_lock:
+            self._thread_cache[key] = result
+            if len(self._thread_cache) > self.thread_cache_size:
+                self._thread_cache.popitem(last=False)
+        return result
     
     def classify_email(self, email: Email) -> Dict[str, Any]:
         """
@@ -79,31 +427,45 @@ class ScaleDownAPIClient:
         Returns:
             Dict with classification results
         """
+        key = ("classify", email.subject, email.sender.email, self._digest(email.body_text))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         email_data = {
             "email_id": email.id,
             "subject": email.subject,
             "sender": email.sender.email,
             "body": email.body_text,
-            "received_at": email.received_at.isoformat()
+            "received_at": email.received_at_iso
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/classify/email",
-                json=email_data,
-                headers=self.headers,
-                timeout=10
-            )
+            response = self._post("/classify/email", email_data, timeout=self.TIMEOUTS["classify"])
             response.raise_for_status()
-            return response.json()
+            result = self._json(response)
+            self._cache_put(key, result)
+            return result
         
         except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
+            logger.warning("ScaleDown API error: %s", e)
             return {
                 "error": str(e),
                 "fallback": True
             }
     
+    def classify_many(self, emails: List[Email]) -> List[Dict[str, Any]]:
+        """
+        Classify several emails with concurrent API calls
+        
+        Args:
+            emails: Email objects to classify
+            
+        Returns:
+            Classification results in the same order as emails
+        """
+        return list(self.executor.map(self.classify_email, emails))
+    
     def extract_entities(self, text: str) -> List[str]:
         """
         Extract entities (people, dates, organizations) from text
@@ -114,19 +476,20 @@ class ScaleDownAPIClient:
         Returns:
             List of extracted entities
         """
+        key = ("entities", self._digest(text))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
-                f"{self.base_url}/extract/entities",
-                json={"text": text},
-                headers=self.headers,
-                timeout=10
-            )
+            response = self._post("/extract/entities", {"text": text}, timeout=self.TIMEOUTS["extract"])
             response.raise_for_status()
-            result = response.json()
-            return result.get("entities", [])
+            entities = self._json(response).get("entities", [])
+            self._cache_put(key, entities)
+            return entities
         
         except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
+            logger.warning("ScaleDown API error: %s", e)
             return []
     
     def generate_response(self, email: Email, context: Optional[str] = None) -> str:
@@ -149,18 +512,13 @@ class ScaleDownAPIClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/generate/response",
-                json=request_data,
-                headers=self.headers,
-                timeout=15
-            )
+            response = self._post("/generate/response", request_data, timeout=self.TIMEOUTS["generate"])
             response.raise_for_status()
-            result = response.json()
+            result = self._json(response)
             return result.get("response", "")
         
         except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
+            logger.warning("ScaleDown API error: %s", e)
             return ""
     
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
@@ -173,18 +531,20 @@ class ScaleDownAPIClient:
         Returns:
             Dict with sentiment analysis results
         """
+        key = ("sentiment", self._digest(text))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = requests.post(
-                f"{self.base_url}/analyze/sentiment",
-                json={"text": text},
-                headers=self.headers,
-                timeout=10
-            )
+            response = self._post("/analyze/sentiment", {"text": text}, timeout=self.TIMEOUTS["sentiment"])
             response.raise_for_status()
-            return response.json()
+            result = self._json(response)
+            self._cache_put(key, result)
+            return result
         
         except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
+            logger.warning("ScaleDown API error: %s", e)
             return {
                 "sentiment": "neutral",
                 "score": 0.5,
@@ -195,12 +555,33 @@ class ScaleDownAPIClient:
         """
         Process multiple emails in batch for efficiency
         
+        Emails are sent in sub-batches of BATCH_CHUNK_SIZE over the shared
+        connection pool. If any sub-batch fails the whole call returns [],
+        so results always line up with the input order.
+        
         Args:
             emails: List of Email objects
             
         Returns:
             List of processing results
         """
+        size = self.BATCH_CHUNK_SIZE
+        chunks = [emails[i:i + size] for i in range(0, len(emails), size)]
+        
+        try:
+            if len(chunks) <= 1:
+                return self._batch_chunk(emails)
+            results = []
+            for chunk_results in self.executor.map(self._batch_chunk, chunks):
+                results.extend(chunk_results)
+            return results
+        
+        except requests.exceptions.RequestException as e:
+            logger.warning("ScaleDown API error: %s", e)
+            return []
+    
+    def _batch_chunk(self, emails: List[Email]) -> List[Dict[str, Any]]:
+        """POST one sub-batch to /batch/process; raises RequestException on failure"""
         batch_data = {
             "emails": [
                 {
@@ -213,19 +594,10 @@ class ScaleDownAPIClient:
             ]
         }
         
-        try:
-            response = requests.post(
-                f"{self.base_url}/batch/process",
-                json=batch_data,
-                headers=self.headers,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json().get("results", [])
-        
-        except requests.exceptions.RequestException as e:
-            print(f"ScaleDown API Error: {e}")
-            return []
+        response = self._post("/batch/process", batch_data, timeout=self.TIMEOUTS["batch"],
+                              compress=True)
+        response.raise_for_status()
+        return self._json(response).get("results", [])
     
     def health_check(self) -> bool:
         """
@@ -235,15 +607,28 @@ class ScaleDownAPIClient:
             True if API is healthy, False otherwise
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/health",
-                headers=self.headers,
-                timeout=5
+                timeout=self.TIMEOUTS["health"]
             )
             return response.status_code == 200
         
         except requests.exceptions.RequestException:
             return False
+    
+    @property
+    def is_healthy(self) -> bool:
+        """Result of the latest background health probe"""
+        return self._healthy.is_set()
+    
+    def _probe_loop(self):
+        while not self._probe_stop.is_set():
+            if self.health_check():
+                self._healthy.set()
+            else:
+                self._healthy.clear()
+            self.health_checked_at = datetime.now()
+            self._probe_stop.wait(self.probe_interval)
 
 
 class HybridCompressor:
@@ -256,14 +641,20 @@ class HybridCompressor:
                  local_compressor=None):
         self.api_client = api_client
         self.local_compressor = local_compressor
-        self.use_api = api_client is not None and api_client.health_check()
+    
+    @property
+    def use_api(self) -> bool:
+        """Follows the client's background health probe, so the API is re-enabled on recovery"""
+        return self.api_client is not None and self.api_client.is_healthy
     
     def compress_thread(self, thread: EmailThread) -> EmailThread:
         """
         Compress thread using API first, fall back to local if needed
         """
+        # While the circuit breaker is open the client answers from its thread
+        # cache or returns a fallback without touching the network
         if self.use_api and self.api_client:
-            print("Using ScaleDown AI API for compression...")
+            logger.debug("Using ScaleDown AI API for compression")
             result = self.api_client.compress_thread(thread)
             
             if not result.get('fallback'):
@@ -279,7 +670,7 @@ class HybridCompressor:
         
         # Fallback to local compression
         if self.local_compressor:
-            print("Falling back to local compression...")
+            logger.debug("Falling back to local compression")
             return self.local_compressor.compress_thread(thread)
         
         return thread
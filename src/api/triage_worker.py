@@ -0,0 +1,59 @@
+"""
+Triage worker for the API's process pool
+Kept free of import-time side effects: pool workers import only this module,
+never the FastAPI app (no ScaleDown client threads, no startup banners)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from ..models import Email
+from ..triage import TriageAgent
+from ..priority import PriorityScorer
+
+
+# Stateless, so each worker process builds its own at import
+triage_agent = TriageAgent()
+priority_scorer = PriorityScorer()
+
+
+def triage_chunk(chunk: List[Email]) -> List[tuple]:
+    """
+    Classify and score a chunk of emails (runs in a worker process)
+    
+    Workers operate on copies, so results are returned as
+    (category, intent, requires_response, score, level) tuples for the
+    caller to apply to the stored emails.
+    """
+    classified = triage_agent.classify_batch(chunk)
+    scores = priority_scorer.score_batch(classified)
+    return [
+        (
+            email.category,
+            email.detected_intent,
+            email.requires_response,
+            score,
+            priority_scorer.assign_priority_level(score)
+        )
+        for email, score in zip(classified, scores)
+    ]
+
+
+def create_pool(server_workers: int = 1) -> ProcessPoolExecutor:
+    """
+    Process pool sized to this server worker's share of the CPUs
+    
+    Workers are started by a fork server (spawn where there is none) rather
+    than forked from the threaded server process, and the fork server
+    preloads only this module instead of the parent's __main__.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context('spawn')
+    
+    max_workers = max(1, (os.cpu_count() or 1) // max(1, server_workers))
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
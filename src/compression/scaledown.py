@@ -1,9 +1,35 @@
 """Email thread compression system - ScaleDown algorithm"""
 
+import io
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from ..models import Email, EmailThread
 
+# Optional: linear-time RE2 engine for the extractor patterns
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+
+def _compile_extractor(pattern: str):
+    """Compile a case-insensitive extractor pattern, with RE2 when installed"""
+    if RE2_AVAILABLE:
+        return re2.compile('(?i)' + pattern)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _dedup_cap(items: List[str], limit: int) -> List[str]:
+    """First `limit` distinct items in order, without scanning past the cap"""
+    seen = {}
+    for item in items:
+        if item not in seen:
+            seen[item] = None
+            if len(seen) == limit:
+                break
+    return list(seen)
+
 
 class EmailThreadCompressor:
     """
@@ -19,14 +45,63 @@ class EmailThreadCompressor:
     
     def __init__(self):
         self.compression_target = 0.85  # 85% reduction target
+        
+        # Patterns are compiled once per compressor, not per message
+        # Signatures, quoted lines and the opening greeting are stripped in a
+        # single scan that gives the same result as stripping them one after
+        # another. Signature cuts truncate to the end of the body; a sign-off
+        # whose trailing newline starts an earlier cut ("Best regards\n--") is
+        # left in place. Quoted and "Sent from my iPhone" lines are dropped in
+        # place. The greeting must fit on one line and is only stripped when a
+        # line survives after it.
+        dropped_line = r'(?:[^\S\n]*>|Sent from my iPhone)[^\n]*'
+        cut_dashes = r'--\s*\n'
+        cut_regards = rf'Best regards,?\n(?!{cut_dashes})'
+        cut_thanks = rf'Thanks,?\n(?!{cut_dashes}|{cut_regards})'
+        self._cleanup_re = re.compile(
+            rf'\A(?:[^\S\n]*>[^\n]*(?:\n{dropped_line})*\n)?'
+            rf'(?:Hi|Hello|Hey|Dear)[^\S\n]+\w+,?[^\S\n]*'
+            rf'(?=(?:\n{dropped_line})*\n(?!{dropped_line}|{cut_dashes}|{cut_regards}|{cut_thanks}))'
+            rf'|\n(?s:{cut_dashes}.*|{cut_regards}.*|{cut_thanks}.*)'
+            r'|\nSent from my iPhone[^\n]*'
+            r'|(?:\A|\n)[^\S\n]*>[^\n]*',
+            re.IGNORECASE,
+        )
+        
+        self._decision_patterns = [
+            _compile_extractor(r'we (decided|agreed|chose|selected) (to |that )?([^.!?]+[.!?])'),
+            _compile_extractor(r'decision: ([^.!?]+[.!?])'),
+            _compile_extractor(r'(will|going to) ([^.!?]+[.!?])'),
+        ]
+        self._sentence_split = re.compile(r'[.!]\s+')
+        self._action_patterns = [
+            _compile_extractor(r'(\w+) (will|should|need to|must) ([^.!?]+[.!?])'),
+            _compile_extractor(r'(\w+)\'s action: ([^.!?]+[.!?])'),
+            _compile_extractor(r'@(\w+) ([^.!?]+[.!?])'),
+        ]
+        self._date_patterns = [
+            _compile_extractor(r'(deadline|due date|by): ([^.!?\n]+)'),
+            _compile_extractor(r'(january|february|march|april|may|june|july|august|september|october|november|december) \d{1,2}'),
+            _compile_extractor(r'\d{1,2}/\d{1,2}/\d{2,4}'),
+        ]
+        
+        # One scan per message finds which extractors can match at all. Each
+        # group is a necessary condition for its pattern family; lookaheads keep
+        # the scan zero-width so adjacent triggers are never consumed.
+        self._trigger_re = re.compile(
+            r'(?=(?P<decision>(?:decided|agreed|chose|selected|will|going to) |decision: ))'
+            r'|(?=(?P<question>\?))'
+            r'|(?=(?P<action> (?:will|should|need to|must) |\'s action: |@\w))'
+            r'|(?=(?P<date>(?:deadline|due date|by): |\d/\d|(?:january|february|march|april|may|june|july|august|september|october|november|december) \d))',
+            re.IGNORECASE,
+        )
     
     def compress_thread(self, thread: EmailThread) -> EmailThread:
         """
         Compress thread and populate compressed_summary field
         """
         # Calculate original token count (approximate)
-        full_text = thread.get_total_text()
-        original_tokens = self._estimate_tokens(full_text)
+        original_tokens = thread.get_total_text_length() // 4
         
         # Perform multi-stage compression
         compressed_data = self._multi_stage_compression(thread)
@@ -53,7 +128,7 @@ class EmailThreadCompressor:
         Multi-stage compression pipeline
         """
         # Stage 1: Remove redundant content
-        cleaned_messages = self._remove_redundant_content(thread.messages)
+        cleaned = self._remove_redundant_content(thread.messages)
         
         # Stage 2: Extract structured information
         extracted_data = {
@@ -63,82 +138,60 @@ class EmailThreadCompressor:
             'timeline': []
         }
         
-        # Extract from each message
-        for msg in cleaned_messages:
+        # Extract from each message, running only the extractors it can feed
+        for msg, text in cleaned:
+            kinds = self._matching_kinds(text)
+            
             # Extract decisions (sentences with decision keywords)
-            decisions = self._extract_decisions(msg)
-            extracted_data['key_decisions'].extend(decisions)
+            if 'decision' in kinds:
+                decisions = self._extract_decisions(text)
+                extracted_data['key_decisions'].extend(decisions)
             
             # Extract questions
-            questions = self._extract_questions(msg)
-            extracted_data['unresolved_questions'].extend(questions)
+            if 'question' in kinds:
+                questions = self._extract_questions(text)
+                extracted_data['unresolved_questions'].extend(questions)
             
             # Extract action items
-            actions = self._extract_action_items(msg)
-            for person, items in actions.items():
-                if person not in extracted_data['action_items']:
-                    extracted_data['action_items'][person] = []
-                extracted_data['action_items'][person].extend(items)
+            if 'action' in kinds:
+                actions = self._extract_action_items(text)
+                for person, items in actions.items():
+                    if person not in extracted_data['action_items']:
+                        extracted_data['action_items'][person] = []
+                    extracted_data['action_items'][person].extend(items)
             
             # Extract timeline events
-            events = self._extract_timeline_events(msg)
-            extracted_data['timeline'].extend(events)
+            if 'date' in kinds:
+                events = self._extract_timeline_events(text, msg.received_at_iso)
+                extracted_data['timeline'].extend(events)
         
-        # Deduplicate
-        extracted_data['key_decisions'] = list(set(extracted_data['key_decisions']))[:10]
-        extracted_data['unresolved_questions'] = list(set(extracted_data['unresolved_questions']))[:10]
+        # Deduplicate, keeping first-seen (chronological) order
+        extracted_data['key_decisions'] = _dedup_cap(extracted_data['key_decisions'], 10)
+        extracted_data['unresolved_questions'] = _dedup_cap(extracted_data['unresolved_questions'], 10)
         extracted_data['timeline'] = extracted_data['timeline'][:15]
         
         return extracted_data
     
-    def _remove_redundant_content(self, messages: List[Email]) -> List[Email]:
-        """Remove signatures, greetings, quoted text"""
-        cleaned = []
-        for msg in messages:
-            text = msg.body_text
-            
-            # Remove email signatures (common patterns)
-            text = re.sub(r'\n--\s*\n.*', '', text, flags=re.DOTALL)
-            text = re.sub(r'\nBest regards,?\n.*', '', text, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r'\nThanks,?\n.*', '', text, flags=re.DOTALL | re.IGNORECASE)
-            text = re.sub(r'\nSent from my iPhone.*', '', text, flags=re.IGNORECASE)
-            
-            # Remove quoted previous messages (lines starting with >)
-            lines = text.split('\n')
-            non_quoted = [line for line in lines if not line.strip().startswith('>')]
-            text = '\n'.join(non_quoted)
-            
-            # Remove common greetings
-            text = re.sub(r'^(Hi|Hello|Hey|Dear)\s+\w+,?\s*\n', '', text, flags=re.IGNORECASE)
-            
-            # Create cleaned copy
-            cleaned_msg = Email(
-                id=msg.id,
-                thread_id=msg.thread_id,
-                subject=msg.subject,
-                sender=msg.sender,
-                recipients=msg.recipients,
-                body_text=text.strip(),
-                received_at=msg.received_at
-            )
-            cleaned.append(cleaned_msg)
-        
-        return cleaned
+    def _remove_redundant_content(self, messages: List[Email]) -> List[Tuple[Email, str]]:
+        """Remove signatures, greetings, quoted text; pair each message with its cleaned body"""
+        cleanup = self._cleanup_re.sub
+        return [(msg, cleanup('', msg.body_text).strip()) for msg in messages]
+    
+    def _matching_kinds(self, text: str) -> set:
+        """Single trigger scan: the extractor kinds that may match in text"""
+        kinds = set()
+        for match in self._trigger_re.finditer(text):
+            kinds.add(match.lastgroup)
+            if len(kinds) == 4:
+                break
+        return kinds
     
-    def _extract_decisions(self, msg: Email) -> List[str]:
+    def _extract_decisions(self, text: str) -> List[str]:
         """Extract decision statements"""
         decisions = []
-        text = msg.body_text
         
-        # Decision keywords
-        decision_patterns = [
-            r'we (decided|agreed|chose|selected) (to |that )?([^.!?]+[.!?])',
-            r'decision: ([^.!?]+[.!?])',
-            r'(will|going to) ([^.!?]+[.!?])',
-        ]
-        
-        for pattern in decision_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in self._decision_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 if isinstance(match, tuple):
                     decision = ' '.join(str(m) for m in match if m).strip()
@@ -149,13 +202,12 @@ class EmailThreadCompressor:
         
         return decisions[:5]  # Limit per message
     
-    def _extract_questions(self, msg: Email) -> List[str]:
+    def _extract_questions(self, text: str) -> List[str]:
         """Extract questions"""
         questions = []
-        text = msg.body_text
         
         # Find sentences ending with ?
-        sentences = re.split(r'[.!]\s+', text)
+        sentences = self._sentence_split.split(text)
         for sentence in sentences:
             if '?' in sentence:
                 question = sentence.strip()
@@ -164,20 +216,12 @@ class EmailThreadCompressor:
         
         return questions[:3]  # Limit per message
     
-    def _extract_action_items(self, msg: Email) -> Dict[str, List[str]]:
+    def _extract_action_items(self, text: str) -> Dict[str, List[str]]:
         """Extract action items"""
         action_items = {}
-        text = msg.body_text
-        
-        # Action patterns
-        action_patterns = [
-            r'(\w+) (will|should|need to|must) ([^.!?]+[.!?])',
-            r'(\w+)\'s action: ([^.!?]+[.!?])',
-            r'@(\w+) ([^.!?]+[.!?])',
-        ]
         
-        for pattern in action_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in self._action_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 if isinstance(match, tuple) and len(match) >= 2:
                     person = match[0].strip()
@@ -190,24 +234,16 @@ class EmailThreadCompressor:
         
         return action_items
     
-    def _extract_timeline_events(self, msg: Email) -> List[Dict[str, Any]]:
+    def _extract_timeline_events(self, text: str, date: str) -> List[Dict[str, Any]]:
         """Extract timeline events"""
         events = []
         
-        # Date patterns
-        date_patterns = [
-            r'(deadline|due date|by): ([^.!?\n]+)',
-            r'(january|february|march|april|may|june|july|august|september|october|november|december) \d{1,2}',
-            r'\d{1,2}/\d{1,2}/\d{2,4}',
-        ]
-        
-        text = msg.body_text
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in self._date_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 event_text = match if isinstance(match, str) else ' '.join(match)
                 events.append({
-                    'date': msg.received_at.isoformat(),
+                    'date': date,
                     'event': event_text[:150]
                 })
         
@@ -215,38 +251,40 @@ class EmailThreadCompressor:
     
     def _format_compressed_summary(self, data: Dict[str, Any]) -> str:
         """Format compressed data into readable summary"""
-        summary_parts = []
+        # Every line is written with its newline; the trailing one is dropped
+        buf = io.StringIO()
+        write = buf.write
         
         # Key Decisions
         if data['key_decisions']:
-            summary_parts.append("KEY DECISIONS:")
+            write("KEY DECISIONS:\n")
             for i, decision in enumerate(data['key_decisions'][:10], 1):
-                summary_parts.append(f"{i}. {decision}")
-            summary_parts.append("")
+                write(f"{i}. {decision}\n")
+            write("\n")
         
         # Unresolved Questions
         if data['unresolved_questions']:
-            summary_parts.append("UNRESOLVED QUESTIONS:")
+            write("UNRESOLVED QUESTIONS:\n")
             for i, question in enumerate(data['unresolved_questions'][:10], 1):
-                summary_parts.append(f"{i}. {question}")
-            summary_parts.append("")
+                write(f"{i}. {question}\n")
+            write("\n")
         
         # Action Items by Person
         if data['action_items']:
-            summary_parts.append("ACTION ITEMS:")
+            write("ACTION ITEMS:\n")
             for person, items in data['action_items'].items():
-                summary_parts.append(f"\n{person}:")
+                write(f"\n{person}:\n")
                 for item in items[:5]:
-                    summary_parts.append(f"  - {item}")
-            summary_parts.append("")
+                    write(f"  - {item}\n")
+            write("\n")
         
         # Timeline
         if data['timeline']:
-            summary_parts.append("TIMELINE:")
+            write("TIMELINE:\n")
             for event in data['timeline'][:10]:
-                summary_parts.append(f"  • {event.get('event', '')}")
+                write(f"  • {event.get('event', '')}\n")
         
-        return "\n".join(summary_parts)
+        return buf.getvalue()[:-1]
     
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count (rough approximation)"""
@@ -1,22 +1,32 @@
 """Email ingestion components"""
 
+import importlib
+
 from .mock_generator import MockEmailGenerator
 
-# Optional real email ingestors
-try:
-    from .gmail_ingestor import GmailIngestor
-except ImportError:
-    GmailIngestor = None
+# Optional real email ingestors, imported on first attribute access (PEP 562)
+# so their client libraries are not loaded unless an ingestor is used.
+# A name resolves to None if its module cannot be imported.
+_OPTIONAL_INGESTORS = {
+    'GmailIngestor': '.gmail_ingestor',
+    'OutlookIngestor': '.outlook_ingestor',
+    'IMAPIngestor': '.imap_ingestor',
+    'get_provider_help': '.imap_ingestor',
+    'fetch_from_accounts': '.imap_ingestor',
+}
+
 
-try:
-    from .outlook_ingestor import OutlookIngestor
-except ImportError:
-    OutlookIngestor = None
+def __getattr__(name):
+    module_name = _OPTIONAL_INGESTORS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    except ImportError:
+        value = None
+    globals()[name] = value
+    return value
 
-try:
-    from .imap_ingestor import IMAPIngestor, get_provider_help
-except ImportError:
-    IMAPIngestor = None
-    get_provider_help = None
 
-__all__ = ['MockEmailGenerator', 'GmailIngestor', 'OutlookIngestor', 'IMAPIngestor', 'get_provider_help']
+__all__ = ['MockEmailGenerator', 'GmailIngestor', 'OutlookIngestor', 'IMAPIngestor', 'get_provider_help',
+           'fetch_from_accounts']
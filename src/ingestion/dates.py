@@ -0,0 +1,44 @@
+"""
+Date header parsing for email ingestors
+Common RFC 2822 dates are matched by one regex; anything else goes to the stdlib parser
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+
+_FAST_DATE_RE = re.compile(
+    r'\s*(?:\w{3}, )?(\d{1,2}) (\w{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2}) ([+-])(\d{2})(\d{2})(?: \([^)]*\))?\s*'
+)
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(date_str: str) -> datetime:
+    """Parse a date header; raises on unparseable input so failures are not cached"""
+    match = _FAST_DATE_RE.fullmatch(date_str)
+    # -0000 means "no zone information" and yields a naive datetime upstream
+    if match and match.group(7, 8, 9) != ('-', '00', '00'):
+        day, mon, year, hour, minute, second, sign, off_h, off_m = match.groups()
+        month = _MONTHS.get(mon.lower())
+        if month:
+            offset = timedelta(hours=int(off_h), minutes=int(off_m))
+            return datetime(
+                int(year), month, int(day), int(hour), int(minute), int(second),
+                tzinfo=timezone(-offset if sign == '-' else offset)
+            )
+    return parsedate_to_datetime(date_str)
+
+
+def parse_date(date_str: str) -> datetime:
+    """Parse a Date header, falling back to the current time"""
+    try:
+        return _parse_date_cached(date_str)
+    except Exception:
+        return datetime.now()
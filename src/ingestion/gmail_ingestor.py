@@ -3,24 +3,143 @@ Gmail Email Ingestor
 Connects to Gmail API to fetch real emails
 """
 
-import base64
+import pickle
 import re
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from datetime import datetime
-from email.utils import parsedate_to_datetime
+from email.utils import getaddresses
 
+# Optional: SIMD base64 decoder for message bodies (same API as the stdlib)
 try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+try:
+    import httplib2
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
     from google_auth_oauthlib.flow import InstalledAppFlow
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
+    from googleapiclient.http import set_user_agent
     GMAIL_AVAILABLE = True
 except ImportError:
     GMAIL_AVAILABLE = False
     print("⚠️ Gmail libraries not installed. Run: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client")
 
 from ..models import Email, EmailAddress, EmailCategory
+from .dates import parse_date
+from .html_text import html_to_text
+
+# Fingerprint of the pickled model layout: the slots, and whether the class
+# pickles its own state (frozen dataclasses do); persisted cache rows written
+# under a different one would unpickle with missing fields
+_CACHE_LAYOUT = zlib.crc32(','.join(
+    f"{','.join(cls.__slots__)}:{'__setstate__' in vars(cls)}"
+    for cls in (Email, EmailAddress)
+).encode()) & 0x7fffffff
+
+# Compiled once: runs for every address header parsed
+_ADDR_RE = re.compile(r'(.+?)\s*<(.+?)>')
+
+
+class MessageCache:
+    """
+    Parsed Gmail messages keyed by (message id, with/without body)
+    
+    Entries are kept pickled in memory and, when a path is given, in SQLite,
+    so every hit returns a fresh Email and polling after a restart is still
+    warm. Message content never changes, but labels do, so entries expire
+    after ttl seconds to refresh the label-based category. The in-memory
+    copy is an LRU of at most max_entries; expired entries are dropped when
+    looked up, and expired rows are deleted whenever new ones are written.
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600,
+                 max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS messages ('
+                    'id TEXT NOT NULL, body INTEGER NOT NULL, '
+                    'fetched_at REAL NOT NULL, data BLOB NOT NULL, '
+                    'PRIMARY KEY (id, body))'
+                )
+                if self._db.execute('PRAGMA user_version').fetchone()[0] != _CACHE_LAYOUT:
+                    self._db.execute('DELETE FROM messages')
+                    self._db.execute(f'PRAGMA user_version = {_CACHE_LAYOUT}')
+                self._db.commit()
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ Gmail message cache disabled: {e}")
+                self._db = None
+    
+    def _remember(self, key: tuple, entry: tuple):
+        """Store an entry in the in-memory LRU (caller holds the lock)"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def get(self, message_id: str, body: bool) -> Optional[Email]:
+        key = (message_id, body)
+        expired_before = time.time() - self.ttl
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] < expired_before:
+                    del self._memory[key]
+                    return None
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                entry = self._db.execute(
+                    'SELECT fetched_at, data FROM messages '
+                    'WHERE id = ? AND body = ? AND fetched_at >= ?',
+                    (message_id, body, expired_before)
+                ).fetchone()
+                if entry is None:
+                    return None
+                self._remember(key, entry)
+            else:
+                return None
+        
+        try:
+            return pickle.loads(entry[1])
+        except Exception:
+            # Written by an older Email layout: treat as a miss and refetch
+            with self._lock:
+                self._memory.pop(key, None)
+            return None
+    
+    def put_many(self, emails: List[Email], body: bool):
+        now = time.time()
+        rows = [(email.id, body, now, pickle.dumps(email)) for email in emails]
+        with self._lock:
+            for message_id, _, fetched_at, data in rows:
+                self._remember((message_id, body), (fetched_at, data))
+            if self._db is not None and rows:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO messages (id, body, fetched_at, data) '
+                    'VALUES (?, ?, ?, ?)',
+                    rows
+                )
+                self._db.execute(
+                    'DELETE FROM messages WHERE fetched_at < ?', (now - self.ttl,)
+                )
+                self._db.commit()
 
 
 class GmailIngestor:
@@ -29,14 +148,40 @@ class GmailIngestor:
     # Gmail API scopes
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
     
+    # Message gets per batch HTTP request (Gmail rate-limits batches above 50)
+    BATCH_SIZE = 50
+    
+    # Retries (with the client library's exponential backoff) for gets that
+    # failed transiently inside a batch: 5xx, 429 and rate-limit 403s
+    RETRY_ATTEMPTS = 5
+    RATE_LIMIT_REASONS = (b'rateLimitExceeded', b'userRateLimitExceeded')
+    
+    # Google APIs only gzip responses for clients whose user agent contains "gzip"
+    USER_AGENT = 'email-triage-assistant (gzip)'
+    HTTP_TIMEOUT = 30
+    
+    # Headers requested when bodies are skipped (format='metadata')
+    METADATA_HEADERS = ['From', 'To', 'Subject', 'Date']
+    
+    # Gmail label ids (lowercased) that hint at a category, in priority order
+    URGENT_LABELS = frozenset({'important', 'starred'})
+    PROMOTIONAL_LABELS = frozenset({'category_promotions'})
+    SOCIAL_LABELS = frozenset({'category_social'})
+    SPAM_LABELS = frozenset({'spam'})
+    
+    # Credentials shared by every ingestor in the process, keyed by token file
+    _credentials: Dict[str, 'Credentials'] = {}
+    
     def __init__(self, credentials_path: str = 'credentials.json', 
-                 token_path: str = 'token.json'):
+                 token_path: str = 'token.json',
+                 cache_path: Optional[str] = '~/.cache/email_triage/messages.sqlite'):
         """
         Initialize Gmail ingestor
         
         Args:
             credentials_path: Path to OAuth credentials file
             token_path: Path to store/load token
+            cache_path: SQLite file for parsed messages (None keeps them in memory only)
         """
         if not GMAIL_AVAILABLE:
             raise ImportError("Gmail libraries not installed")
@@ -44,6 +189,7 @@ class GmailIngestor:
         self.credentials_path = credentials_path
         self.token_path = token_path
         self.service = None
+        self.cache = MessageCache(os.path.expanduser(cache_path) if cache_path else None)
     
     def authenticate(self) -> bool:
         """
@@ -52,19 +198,23 @@ class GmailIngestor:
         Returns:
             True if authentication successful
         """
-        creds = None
+        # Reuse credentials already loaded for this token file
+        creds = GmailIngestor._credentials.get(self.token_path)
         
         # Load existing token
-        try:
-            if os.path.exists(self.token_path):
-                creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
-        except Exception as e:
-            print(f"Error loading token: {e}")
+        if creds is None:
+            try:
+                if os.path.exists(self.token_path):
+                    creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
+            except Exception as e:
+                print(f"Error loading token: {e}")
         
-        # Refresh or get new credentials
+        # Refresh or get new credentials (valid is False shortly before expiry)
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
+                old_refresh_token = creds.refresh_token
                 creds.refresh(Request())
+                save = creds.refresh_token != old_refresh_token
             else:
                 if not os.path.exists(self.credentials_path):
                     print(f"❌ Credentials file not found: {self.credentials_path}")
@@ -78,18 +228,31 @@ class GmailIngestor:
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.credentials_path, self.SCOPES)
                 creds = flow.run_local_server(port=0)
+                save = True
             
-            # Save credentials
-            with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
+            # Save credentials (only when the refresh token is new; access
+            # tokens are cheap to refresh again in the next process)
+            if save:
+                with open(self.token_path, 'w') as token:
+                    token.write(creds.to_json())
+        
+        GmailIngestor._credentials[self.token_path] = creds
         
-        # Build service
-        self.service = build('gmail', 'v1', credentials=creds)
+        # Build service on one persistent, gzip-enabled connection.
+        # httplib2 keeps the TLS connection open across gets and batches.
+        http = httplib2.Http(timeout=self.HTTP_TIMEOUT)
+        set_user_agent(http, self.USER_AGENT)
+        self.service = build(
+            'gmail', 'v1',
+            http=AuthorizedHttp(creds, http=http),
+            cache_discovery=False
+        )
         return True
     
     def fetch_emails(self, max_results: int = 50, 
                      query: str = '',
-                     label_ids: List[str] = None) -> List[Email]:
+                     label_ids: List[str] = None,
+                     body: bool = True) -> List[Email]:
         """
         Fetch emails from Gmail
         
@@ -97,6 +260,7 @@ class GmailIngestor:
             max_results: Maximum number of emails to fetch
             query: Gmail search query (e.g., 'is:unread', 'from:boss@company.com')
             label_ids: Filter by label IDs (e.g., ['INBOX', 'UNREAD'])
+            body: Download message bodies; False fetches headers and labels only
         
         Returns:
             List of Email objects
@@ -120,11 +284,7 @@ class GmailIngestor:
                 print('No messages found.')
                 return []
             
-            emails = []
-            for msg in messages:
-                email = self._fetch_email_details(msg['id'])
-                if email:
-                    emails.append(email)
+            emails = self._fetch_email_batch([msg['id'] for msg in messages], body)
             
             print(f"✅ Fetched {len(emails)} emails from Gmail")
             return emails
@@ -133,71 +293,160 @@ class GmailIngestor:
             print(f'Gmail API error: {error}')
             return []
     
-    def _fetch_email_details(self, message_id: str) -> Optional[Email]:
-        """Fetch full details of a single email"""
-        try:
-            message = self.service.users().messages().get(
-                userId='me', 
+    def _fetch_email_batch(self, message_ids: List[str], body: bool = True) -> List[Email]:
+        """
+        Fetch message details with batch HTTP requests of BATCH_SIZE gets
+        
+        Messages already in the cache are not requested again. Messages
+        whose get fails transiently (5xx, 429 or a rate-limit 403), or whose
+        whole batch fails, are retried one by one with backoff. Results keep
+        the order of message_ids.
+        """
+        parsed = {}
+        retry_ids = []
+        
+        for message_id in message_ids:
+            email = self.cache.get(message_id, body)
+            if email:
+                parsed[message_id] = email
+        missing = [mid for mid in message_ids if mid not in parsed]
+        
+        def on_response(request_id, response, exception):
+            if exception is None:
+                parsed[request_id] = self._parse_message(response)
+            elif self._is_transient(exception):
+                retry_ids.append(request_id)
+            else:
+                print(f'Error fetching message {request_id}: {exception}')
+        
+        for start in range(0, len(missing), self.BATCH_SIZE):
+            chunk = missing[start:start + self.BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for message_id in chunk:
+                batch.add(self._get_request(message_id, body), request_id=message_id)
+            try:
+                batch.execute()
+            except HttpError as error:
+                print(f'Gmail batch request failed, fetching individually: {error}')
+                retry_ids.extend(mid for mid in chunk if mid not in parsed)
+        
+        for message_id in retry_ids:
+            email = self._fetch_email_details(message_id, body, num_retries=self.RETRY_ATTEMPTS)
+            if email:
+                parsed[message_id] = email
+        
+        self.cache.put_many([parsed[mid] for mid in missing if mid in parsed], body)
+        return [parsed[mid] for mid in message_ids if mid in parsed]
+    
+    @classmethod
+    def _is_transient(cls, exception: Exception) -> bool:
+        """True for get errors worth retrying: server errors and rate limiting"""
+        if not isinstance(exception, HttpError):
+            return False
+        status = exception.resp.status
+        if status >= 500 or status == 429:
+            return True
+        return status == 403 and any(
+            reason in (exception.content or b'') for reason in cls.RATE_LIMIT_REASONS
+        )
+    
+    def _get_request(self, message_id: str, body: bool = True):
+        """
+        Build a users.messages.get request
+        
+        Without body, asks for format='metadata' with a partial-response
+        mask, so Gmail returns only ids, labels and the triage headers.
+        """
+        if body:
+            return self.service.users().messages().get(
+                userId='me',
                 id=message_id,
                 format='full'
-            ).execute()
-            
-            # Extract headers
-            headers = {h['name']: h['value'] 
-                      for h in message['payload']['headers']}
-            
-            # Parse sender
-            sender_str = headers.get('From', '')
-            sender = self._parse_email_address(sender_str)
-            
-            # Parse recipients
-            to_str = headers.get('To', '')
-            recipients = [self._parse_email_address(addr) 
-                         for addr in to_str.split(',') if addr]
-            
-            # Get subject
-            subject = headers.get('Subject', '(No Subject)')
-            
-            # Get body
-            body_text = self._get_email_body(message['payload'])
-            
-            # Get date
-            date_str = headers.get('Date', '')
-            received_at = self._parse_date(date_str)
-            
-            # Get thread ID
-            thread_id = message.get('threadId', '')
-            
-            # Get labels (for initial categorization hint)
-            labels = message.get('labelIds', [])
-            
-            # Create Email object
-            email = Email(
-                id=message_id,
-                thread_id=thread_id,
-                subject=subject,
-                sender=sender,
-                recipients=recipients,
-                body_text=body_text,
-                received_at=received_at,
-                category=self._guess_category_from_labels(labels)
             )
-            
-            return email
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='metadata',
+            metadataHeaders=self.METADATA_HEADERS,
+            fields='id,threadId,labelIds,payload/headers'
+        )
+    
+    def _fetch_email_details(self, message_id: str, body: bool = True,
+                             num_retries: int = 0) -> Optional[Email]:
+        """
+        Fetch details of a single email
+        
+        num_retries is passed to execute(), which backs off exponentially
+        between attempts on 5xx, 429 and rate-limit 403 responses.
+        """
+        try:
+            message = self._get_request(message_id, body).execute(num_retries=num_retries)
+            return self._parse_message(message)
         
         except HttpError as error:
             print(f'Error fetching message {message_id}: {error}')
             return None
     
+    def _parse_message(self, message: dict) -> Email:
+        """Build an Email from a users.messages.get response"""
+        message_id = message['id']
+        
+        # Extract headers
+        headers = {h['name']: h['value'] 
+                  for h in message['payload']['headers']}
+        
+        # Parse sender
+        sender_str = headers.get('From', '')
+        sender = self._parse_email_address(sender_str)
+        
+        # Parse recipients (getaddresses handles commas inside quoted names)
+        to_str = headers.get('To', '')
+        recipients = [EmailAddress(name=name, email=addr)
+                      for name, addr in getaddresses([to_str]) if addr]
+        
+        # Get subject
+        subject = headers.get('Subject', '(No Subject)')
+        
+        # Get body (empty for metadata-only responses)
+        body_text = self._get_email_body(message['payload'])
+        
+        # Get date
+        date_str = headers.get('Date', '')
+        received_at = self._parse_date(date_str)
+        
+        # Get thread ID
+        thread_id = message.get('threadId', '')
+        
+        # Get labels (for initial categorization hint)
+        labels = message.get('labelIds', [])
+        
+        # Create Email object
+        email = Email(
+            id=message_id,
+            thread_id=thread_id,
+            subject=subject,
+            sender=sender,
+            recipients=recipients,
+            body_text=body_text,
+            received_at=received_at,
+            category=self._guess_category_from_labels(labels)
+        )
+        
+        return email
+    
     def _parse_email_address(self, addr_str: str) -> EmailAddress:
         """Parse email address from string like 'Name <email@example.com>'"""
-        match = re.match(r'(.+?)\s*<(.+?)>', addr_str.strip())
+        addr_str = addr_str.strip()
+        if '<' not in addr_str:
+            # Bare address: nothing for the regex to find
+            return EmailAddress(name='', email=addr_str)
+        match = _ADDR_RE.match(addr_str)
         if match:
             name, email = match.groups()
             return EmailAddress(name=name.strip('"'), email=email.strip())
         else:
             # Just email address
-            return EmailAddress(name='', email=addr_str.strip())
+            return EmailAddress(name='', email=addr_str)
     
     def _get_email_body(self, payload: dict) -> str:
         """Extract email body from payload"""
@@ -205,71 +454,72 @@ class GmailIngestor:
         
         # Check for direct body
         if 'body' in payload and payload['body'].get('data'):
-            body_text = base64.urlsafe_b64decode(
+            body_text = _b64.urlsafe_b64decode(
                 payload['body']['data']
             ).decode('utf-8', errors='ignore')
         
-        # Check for parts (multipart)
+        # Check for parts (multipart): plain parts are decoded into one
+        # buffer and turned into text once at the end
         elif 'parts' in payload:
+            plain = bytearray()
             for part in payload['parts']:
                 if part['mimeType'] == 'text/plain':
                     if part['body'].get('data'):
-                        body_text += base64.urlsafe_b64decode(
-                            part['body']['data']
-                        ).decode('utf-8', errors='ignore')
-                elif part['mimeType'] == 'text/html' and not body_text:
+                        plain += _b64.urlsafe_b64decode(part['body']['data'])
+                elif part['mimeType'] == 'text/html' and not plain and not body_text:
                     # Fallback to HTML if no plain text
                     if part['body'].get('data'):
-                        html = base64.urlsafe_b64decode(
+                        html = _b64.urlsafe_b64decode(
                             part['body']['data']
                         ).decode('utf-8', errors='ignore')
-                        # Strip HTML tags (basic)
-                        body_text = re.sub('<[^<]+?>', '', html)
+                        body_text = html_to_text(html)
+            body_text += plain.decode('utf-8', errors='ignore')
         
         return body_text.strip()
     
     def _parse_date(self, date_str: str) -> datetime:
         """Parse date from email header"""
-        try:
-            return parsedate_to_datetime(date_str)
-        except:
-            return datetime.now()
+        return parse_date(date_str)
     
     def _guess_category_from_labels(self, labels: List[str]) -> EmailCategory:
         """Make initial category guess from Gmail labels"""
-        labels_lower = [l.lower() for l in labels]
+        labels_lower = {l.lower() for l in labels}
         
-        if 'important' in labels_lower or 'starred' in labels_lower:
+        if not labels_lower.isdisjoint(self.URGENT_LABELS):
             return EmailCategory.URGENT
-        elif 'category_promotions' in labels_lower:
+        elif not labels_lower.isdisjoint(self.PROMOTIONAL_LABELS):
             return EmailCategory.PROMOTIONAL
-        elif 'category_social' in labels_lower:
+        elif not labels_lower.isdisjoint(self.SOCIAL_LABELS):
             return EmailCategory.SOCIAL
-        elif 'spam' in labels_lower:
+        elif not labels_lower.isdisjoint(self.SPAM_LABELS):
             return EmailCategory.SPAM
         else:
             return EmailCategory.WORK
     
-    def fetch_unread_emails(self, max_results: int = 50) -> List[Email]:
+    def fetch_unread_emails(self, max_results: int = 50, body: bool = True) -> List[Email]:
         """Fetch only unread emails"""
         return self.fetch_emails(
             max_results=max_results,
-            label_ids=['INBOX', 'UNREAD']
+            label_ids=['INBOX', 'UNREAD'],
+            body=body
         )
     
     def fetch_emails_by_sender(self, sender_email: str, 
-                               max_results: int = 50) -> List[Email]:
+                               max_results: int = 50,
+                               body: bool = True) -> List[Email]:
         """Fetch emails from specific sender"""
         return self.fetch_emails(
             max_results=max_results,
-            query=f'from:{sender_email}'
+            query=f'from:{sender_email}',
+            body=body
         )
     
-    def fetch_today_emails(self, max_results: int = 100) -> List[Email]:
+    def fetch_today_emails(self, max_results: int = 100, body: bool = True) -> List[Email]:
         """Fetch today's emails"""
         return self.fetch_emails(
             max_results=max_results,
-            query='newer_than:1d'
+            query='newer_than:1d',
+            body=body
         )
 
 
@@ -0,0 +1,38 @@
+"""
+HTML to plain text for email bodies
+Single linear pass with the stdlib HTML parser (no backtracking regex)
+"""
+
+from html.parser import HTMLParser
+from typing import List
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text nodes; tags, scripts and styles are dropped, entities decoded"""
+    
+    SKIP_TAGS = {'script', 'style'}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+    
+    def handle_data(self, data: str):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Strip tags from an HTML body, keeping its text content"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ''.join(parser.parts)
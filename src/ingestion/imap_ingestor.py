@@ -2,16 +2,142 @@
 IMAP Email Ingestor
 Universal email integration - works with Gmail, Outlook, Yahoo, and any IMAP server
 No OAuth setup required - just email and password/app password
+Kept free of import-time side effects: parse pool workers import this module
 """
 
+import atexit
 import imaplib
 import email
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from email.header import decode_header
-from typing import List, Optional
+from email.utils import getaddresses
+from typing import Iterator, List, Optional
 from datetime import datetime
 import re
 
+# Optional: IMAP IDLE (push) support for stream_new_messages
+try:
+    from imapclient import IMAPClient
+    IMAPCLIENT_AVAILABLE = True
+except ImportError:
+    IMAPCLIENT_AVAILABLE = False
+
 from ..models import Email, EmailAddress, EmailCategory
+from .dates import parse_date
+from .html_text import html_to_text
+
+# Compiled once: runs for every address header parsed
+_ADDR_RE = re.compile(r'([^<]*)<([^>]+)>')
+
+# FETCH response parsing: "<seq> (" opens a message, FLAGS (...) anywhere in it
+_FETCH_START_RE = re.compile(rb'\s*(\d+) \(')
+_FETCH_FLAGS_RE = re.compile(rb'FLAGS \(([^)]*)\)')
+
+# LIST response: (attributes) delimiter name, where the delimiter is a quoted
+# character or NIL and the name a quoted string, a literal or an atom
+_LIST_RE = re.compile(
+    r'\((?P<attributes>[^)]*)\)\s+(?:"(?:[^"\\]|\\.)*"|NIL)\s+'
+    r'(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|\{\d+\}|(?P<atom>\S+))\s*$',
+    re.IGNORECASE
+)
+_QUOTED_ESCAPE_RE = re.compile(r'\\(.)')
+
+
+def _parse_list_response(folder) -> Optional[tuple]:
+    """
+    (attributes, name) from one imaplib LIST response item, or None
+    
+    e.g. b'(\\HasNoChildren \\Sent) "/" Sent' -> ('\\HasNoChildren \\Sent', 'Sent')
+    and b'(\\HasNoChildren) "." "Sent Items"' -> ('\\HasNoChildren', 'Sent Items').
+    Names sent as literals arrive as a (line, name) tuple.
+    """
+    if isinstance(folder, tuple):
+        line, literal = folder[0], folder[1].decode()
+    else:
+        line, literal = folder, None
+    if not line:
+        return None
+    
+    match = _LIST_RE.match(line.decode())
+    if not match:
+        return None
+    if match.group('quoted') is not None:
+        name = _QUOTED_ESCAPE_RE.sub(r'\1', match.group('quoted'))
+    else:
+        name = match.group('atom') or literal
+    if name is None:
+        return None
+    return match.group('attributes'), name
+
+
+def _quote_mailbox(name: str) -> str:
+    """IMAP quoted-string form of a mailbox name"""
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _sequence_set(email_ids: List[bytes]) -> str:
+    """IMAP sequence set for the ids, e.g. [1, 2, 3, 7, 9, 10] -> '1:3,7,9:10'"""
+    numbers = sorted({int(i) for i in email_ids})
+    ranges = []
+    start = prev = numbers[0]
+    for n in numbers[1:]:
+        if n != prev + 1:
+            ranges.append(f'{start}:{prev}' if start != prev else str(start))
+            start = n
+        prev = n
+    ranges.append(f'{start}:{prev}' if start != prev else str(start))
+    return ','.join(ranges)
+
+
+# One parse pool for every ingestor, including fetch_from_accounts' threads:
+# created by the first large fetch, shut down on disconnect once idle, or at exit
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_users = 0
+_parse_pool_lock = threading.Lock()
+
+
+def _acquire_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Shared parse pool, created on first use
+    
+    Workers are started by a fork server (spawn where there is none) rather
+    than forked from a possibly threaded caller, and the fork server preloads
+    only this module. Pair every call with _release_parse_pool().
+    """
+    global _parse_pool, _parse_pool_users
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _parse_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        _parse_pool_users += 1
+        return _parse_pool
+
+
+def _release_parse_pool():
+    global _parse_pool_users
+    with _parse_pool_lock:
+        _parse_pool_users -= 1
+
+
+def shutdown_parse_pool():
+    """Shut down the shared parse pool unless a fetch is still using it"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool_users:
+            return
+        pool, _parse_pool = _parse_pool, None
+    pool.shutdown(wait=False)
+
+
+atexit.register(shutdown_parse_pool)
 
 
 class IMAPIngestor:
@@ -53,6 +179,21 @@ class IMAPIngestor:
         }
     }
     
+    # Parse in a process pool from this many messages up: MIME decoding and
+    # HTML stripping are pure Python, so threads would just contend for the GIL
+    PARALLEL_PARSE_MIN = 200
+    
+    # Size of the shared parse pool; capped because fetch_from_accounts'
+    # workers all share it and parsing is only part of each fetch
+    PARSE_WORKERS = min(4, os.cpu_count() or 1)
+    
+    # Seconds per IDLE check (or poll) in stream_new_messages; well inside
+    # the 29 minute limit RFC 2177 gives before an IDLE must be renewed
+    IDLE_TIMEOUT = 30
+    
+    # Sent folder names to try when the server does not flag one as \Sent
+    SENT_FOLDERS = ('Sent', '[Gmail]/Sent Mail', 'Sent Items', 'Sent Messages')
+    
     def __init__(self, email_address: str, password: str, 
                  provider: str = None, server: str = None, port: int = 993):
         """
@@ -68,6 +209,7 @@ class IMAPIngestor:
         self.email_address = email_address
         self.password = password
         self.mail = None
+        self._sent_folder: Optional[str] = None
         
         # Auto-detect provider from email if not specified
         if not provider and not server:
@@ -108,6 +250,7 @@ class IMAPIngestor:
         try:
             print(f"🔐 Connecting to {self.server}...")
             self.mail = imaplib.IMAP4_SSL(self.server, self.port)
+            self._sent_folder = None
             self.mail.login(self.email_address, self.password)
             print("✅ Successfully connected and authenticated")
             return True
@@ -127,7 +270,8 @@ class IMAPIngestor:
     def fetch_emails(self, folder: str = 'INBOX', 
                      max_results: int = 50,
                      unread_only: bool = False,
-                     since_date: Optional[str] = None) -> List[Email]:
+                     since_date: Optional[str] = None,
+                     body: bool = True) -> List[Email]:
         """
         Fetch emails from specified folder
         
@@ -136,6 +280,7 @@ class IMAPIngestor:
             max_results: Maximum number of emails to fetch
             unread_only: Only fetch unread emails
             since_date: Fetch emails since date (format: 'DD-Mon-YYYY' e.g. '01-Jan-2024')
+            body: Download message bodies; False fetches headers and flags only
         
         Returns:
             List of Email objects
@@ -170,15 +315,24 @@ class IMAPIngestor:
             
             print(f"📧 Found {len(email_ids)} emails, fetching...")
             
-            emails = []
-            for i, email_id in enumerate(email_ids, 1):
-                email_obj = self._fetch_email_details(email_id)
-                if email_obj:
-                    emails.append(email_obj)
-                
-                # Progress indicator
-                if i % 10 == 0:
-                    print(f"   Processed {i}/{len(email_ids)} emails...")
+            # One FETCH round trip; consecutive ids collapse into ranges
+            items = '(RFC822.HEADER BODY.PEEK[TEXT] FLAGS)' if body else '(RFC822.HEADER FLAGS)'
+            _, msg_data = self.mail.fetch(_sequence_set(email_ids), items)
+            
+            messages = self._split_fetch_response(msg_data)
+            ids = [m[0] for m in messages]
+            raws = [header + text for _, header, text, _ in messages]
+            flags = [m[3] for m in messages]
+            
+            if len(messages) >= self.PARALLEL_PARSE_MIN and self.PARSE_WORKERS > 1:
+                pool = _acquire_parse_pool(self.PARSE_WORKERS)
+                try:
+                    parsed = list(pool.map(self._parse_email, ids, raws, flags, chunksize=32))
+                finally:
+                    _release_parse_pool()
+            else:
+                parsed = list(map(self._parse_email, ids, raws, flags))
+            emails = [email_obj for email_obj in parsed if email_obj]
             
             print(f"✅ Successfully fetched {len(emails)} emails")
             return emails
@@ -187,29 +341,184 @@ class IMAPIngestor:
             print(f"❌ Error fetching emails: {e}")
             return []
     
+    def _split_fetch_response(self, msg_data: list) -> List[tuple]:
+        """
+        Group a multi-message FETCH response into per-message parts
+        
+        imaplib returns (prefix, literal) tuples for each literal and bare
+        bytes for the text between them. Returns (seq, header, text, flags)
+        tuples in server order; text is b'' when only headers were fetched.
+        """
+        messages = []
+        current = None
+        for item in msg_data:
+            if isinstance(item, tuple):
+                prefix, literal = item
+                start = _FETCH_START_RE.match(prefix)
+                if start:
+                    current = {'seq': start.group(1), 'meta': prefix,
+                               'header': b'', 'text': b''}
+                    messages.append(current)
+                elif current is not None:
+                    current['meta'] += prefix
+                else:
+                    continue
+                if b'RFC822.HEADER' in prefix or b'BODY[HEADER]' in prefix:
+                    current['header'] = literal
+                elif b'BODY[TEXT]' in prefix:
+                    current['text'] = literal
+            elif isinstance(item, bytes) and current is not None:
+                # Skip unsolicited "<seq> (FLAGS ...)" updates
+                if not _FETCH_START_RE.match(item):
+                    current['meta'] += item
+        
+        result = []
+        for msg in messages:
+            flags = _FETCH_FLAGS_RE.search(msg['meta'])
+            result.append((msg['seq'], msg['header'], msg['text'],
+                           flags.group(1).split() if flags else []))
+        return result
+    
+    def stream_new_messages(self, folder: str = 'INBOX',
+                            last_uid: Optional[int] = None,
+                            body: bool = True) -> Iterator[Email]:
+        """
+        Yield new emails as they arrive, for a long-running triage loop
+        
+        Only UIDs above the highest one already seen are searched and
+        fetched, so an idle inbox costs no FETCH traffic. Waits with IMAP
+        IDLE when imapclient is installed and the server supports it,
+        otherwise polls with NOOP every IDLE_TIMEOUT seconds.
+        
+        Args:
+            folder: Folder to watch
+            last_uid: Resume after this UID; None starts with the next new message
+            body: Download message bodies; False fetches headers and flags only
+        
+        Yields:
+            Email objects in arrival order
+        """
+        if IMAPCLIENT_AVAILABLE:
+            yield from self._stream_with_idle(folder, last_uid, body)
+        else:
+            yield from self._stream_with_polling(folder, last_uid, body)
+    
+    def _stream_with_idle(self, folder: str, last_uid: Optional[int],
+                          body: bool) -> Iterator[Email]:
+        """stream_new_messages over a dedicated imapclient connection"""
+        # IDLE ties up the connection, so self.mail stays free for other calls
+        client = IMAPClient(self.server, port=self.port, ssl=True)
+        try:
+            client.login(self.email_address, self.password)
+            status = client.select_folder(folder, readonly=True)
+            if last_uid is None:
+                last_uid = status.get(b'UIDNEXT', 1) - 1
+            can_idle = client.has_capability('IDLE')
+            items = [b'RFC822.HEADER', b'BODY.PEEK[TEXT]', b'FLAGS'] if body else [b'RFC822.HEADER', b'FLAGS']
+            
+            new_mail = True
+            while True:
+                if new_mail:
+                    # "n:*" always matches the highest UID, even when it is below n
+                    uids = [uid for uid in client.search(['UID', f'{last_uid + 1}:*'])
+                            if uid > last_uid]
+                    if uids:
+                        response = client.fetch(uids, items)
+                        for uid in sorted(response):
+                            data = response[uid]
+                            email_obj = self._parse_email(
+                                str(data.get(b'SEQ', uid)).encode(),
+                                data.get(b'RFC822.HEADER', b'') + data.get(b'BODY[TEXT]', b''),
+                                list(data.get(b'FLAGS', ()))
+                            )
+                            if email_obj:
+                                yield email_obj
+                        last_uid = max(uids)
+                
+                if can_idle:
+                    client.idle()
+                    try:
+                        responses = client.idle_check(timeout=self.IDLE_TIMEOUT)
+                    finally:
+                        client.idle_done()
+                else:
+                    time.sleep(self.IDLE_TIMEOUT)
+                    responses = client.noop()[1]
+                new_mail = any(len(r) > 1 and r[1] == b'EXISTS' for r in responses)
+        finally:
+            try:
+                client.logout()
+            except Exception:
+                pass
+    
+    def _stream_with_polling(self, folder: str, last_uid: Optional[int],
+                             body: bool) -> Iterator[Email]:
+        """stream_new_messages with plain imaplib: NOOP polling on self.mail"""
+        if not self.mail:
+            if not self.connect():
+                return
+        
+        self.mail.select(folder, readonly=True)
+        if last_uid is None:
+            _, uidnext = self.mail.response('UIDNEXT')
+            if uidnext[0]:
+                last_uid = int(uidnext[0]) - 1
+            else:
+                _, data = self.mail.uid('SEARCH', None, 'ALL')
+                last_uid = max((int(uid) for uid in data[0].split()), default=0)
+        self.mail.response('EXISTS')
+        items = '(UID RFC822.HEADER BODY.PEEK[TEXT] FLAGS)' if body else '(UID RFC822.HEADER FLAGS)'
+        
+        new_mail = True
+        while True:
+            if new_mail:
+                _, data = self.mail.uid('SEARCH', None, f'UID {last_uid + 1}:*')
+                uids = [uid for uid in data[0].split() if int(uid) > last_uid]
+                if uids:
+                    _, msg_data = self.mail.uid('FETCH', _sequence_set(uids), items)
+                    for seq, header, text, flags in self._split_fetch_response(msg_data):
+                        email_obj = self._parse_email(seq, header + text, flags)
+                        if email_obj:
+                            yield email_obj
+                    last_uid = max(int(uid) for uid in uids)
+            
+            time.sleep(self.IDLE_TIMEOUT)
+            self.mail.noop()
+            # NOOP delivers pending untagged EXISTS updates for the mailbox
+            _, exists = self.mail.response('EXISTS')
+            new_mail = exists[0] is not None
+    
     def _fetch_email_details(self, email_id: bytes) -> Optional[Email]:
         """Fetch full details of a single email"""
         try:
-            # Fetch email
             _, msg_data = self.mail.fetch(email_id, '(RFC822)')
-            email_body = msg_data[0][1]
-            email_message = email.message_from_bytes(email_body)
+            return self._parse_email(email_id, msg_data[0][1])
+        except Exception as e:
+            print(f"   ⚠️  Error fetching email {email_id}: {e}")
+            return None
+    
+    @staticmethod
+    def _parse_email(email_id: bytes, raw: bytes,
+                     flags: Optional[List[bytes]] = None) -> Optional[Email]:
+        """Build an Email from raw RFC 822 bytes (body may be absent)"""
+        try:
+            email_message = email.message_from_bytes(raw)
             
             # Parse subject
-            subject = self._decode_header(email_message.get('Subject', ''))
+            subject = IMAPIngestor._decode_header(email_message.get('Subject', ''))
             
             # Parse sender
             from_str = email_message.get('From', '')
-            sender = self._parse_email_address(from_str)
+            sender = IMAPIngestor._parse_email_address(from_str)
             
-            # Parse recipients
+            # Parse recipients (getaddresses handles commas inside quoted names)
             to_str = email_message.get('To', '')
-            recipients = [self._parse_email_address(addr) 
-                         for addr in to_str.split(',') if addr]
+            recipients = [EmailAddress(name=name, email=addr)
+                          for name, addr in getaddresses([str(to_str)]) if addr]
             
             # Parse date
             date_str = email_message.get('Date', '')
-            received_at = self._parse_date(date_str)
+            received_at = IMAPIngestor._parse_date(date_str)
             
             # Get message ID for threading
             message_id = email_message.get('Message-ID', email_id.decode())
@@ -217,7 +526,7 @@ class IMAPIngestor:
             thread_id = in_reply_to if in_reply_to else message_id
             
             # Extract body
-            body_text = self._get_email_body(email_message)
+            body_text = IMAPIngestor._get_email_body(email_message)
             
             # Create Email object
             return Email(
@@ -228,14 +537,16 @@ class IMAPIngestor:
                 recipients=recipients,
                 body_text=body_text,
                 received_at=received_at,
-                category=EmailCategory.WORK  # Will be classified later
+                category=EmailCategory.WORK,  # Will be classified later
+                has_been_read=b'\\Seen' in (flags or [])
             )
         
         except Exception as e:
             print(f"   ⚠️  Error parsing email {email_id}: {e}")
             return None
     
-    def _decode_header(self, header: str) -> str:
+    @staticmethod
+    def _decode_header(header: str) -> str:
         """Decode email header (handles encoded subjects)"""
         if not header:
             return '(No Subject)'
@@ -252,10 +563,14 @@ class IMAPIngestor:
         
         return ''.join(decoded_parts)
     
-    def _parse_email_address(self, addr_str: str) -> EmailAddress:
+    @staticmethod
+    def _parse_email_address(addr_str: str) -> EmailAddress:
         """Parse email address from string"""
         # Pattern: "Name" <email@example.com> or Name <email@example.com> or just email@example.com
-        match = re.search(r'([^<]*)<([^>]+)>', addr_str)
+        if '<' not in addr_str:
+            # Bare address: nothing for the regex to find
+            return EmailAddress(name='', email=addr_str.strip())
+        match = _ADDR_RE.search(addr_str)
         if match:
             name = match.group(1).strip(' "')
             email_addr = match.group(2).strip()
@@ -264,32 +579,41 @@ class IMAPIngestor:
             # Just email address
             return EmailAddress(name='', email=addr_str.strip())
     
-    def _get_email_body(self, email_message) -> str:
+    @staticmethod
+    def _get_email_body(email_message) -> str:
         """Extract email body text"""
         body_text = ''
         
         if email_message.is_multipart():
-            # Multipart email
+            # Multipart email: plain parts are collected into one buffer and
+            # decoded once at the end
+            plain = bytearray()
             for part in email_message.walk():
                 content_type = part.get_content_type()
                 content_disposition = str(part.get('Content-Disposition', ''))
                 
-                # Skip attachments
+                # Skip attachments and non-text parts before decoding, so
+                # their (often large) base64 payloads are never decoded
                 if 'attachment' in content_disposition:
                     continue
+                if content_type == 'text/html':
+                    # Fallback to HTML if no plain text
+                    if plain or body_text:
+                        continue
+                elif content_type != 'text/plain':
+                    continue
                 
                 try:
                     part_body = part.get_payload(decode=True)
                     if part_body:
                         if content_type == 'text/plain':
-                            body_text += part_body.decode('utf-8', errors='ignore')
-                        elif content_type == 'text/html' and not body_text:
-                            # Fallback to HTML if no plain text
+                            plain += part_body
+                        else:
                             html = part_body.decode('utf-8', errors='ignore')
-                            # Basic HTML stripping
-                            body_text = re.sub('<[^<]+?>', '', html)
+                            body_text = html_to_text(html)
                 except Exception as e:
                     pass
+            body_text += plain.decode('utf-8', errors='ignore')
         else:
             # Single part email
             try:
@@ -301,35 +625,64 @@ class IMAPIngestor:
         
         return body_text.strip()
     
-    def _parse_date(self, date_str: str) -> datetime:
+    @staticmethod
+    def _parse_date(date_str: str) -> datetime:
         """Parse date from email header"""
-        try:
-            from email.utils import parsedate_to_datetime
-            return parsedate_to_datetime(date_str)
-        except:
-            return datetime.now()
+        return parse_date(date_str)
     
-    def fetch_unread_emails(self, max_results: int = 50) -> List[Email]:
+    def fetch_unread_emails(self, max_results: int = 50, body: bool = True) -> List[Email]:
         """Fetch only unread emails"""
         return self.fetch_emails(
             folder='INBOX',
             max_results=max_results,
-            unread_only=True
+            unread_only=True,
+            body=body
         )
     
     def fetch_sent_emails(self, max_results: int = 50) -> List[Email]:
         """Fetch sent emails"""
-        # Try common sent folder names
-        sent_folders = ['Sent', '[Gmail]/Sent Mail', 'Sent Items', 'Sent Messages']
+        if not self.mail:
+            if not self.connect():
+                return []
         
-        for folder in sent_folders:
+        # Looked up once per connection from a single LIST
+        if self._sent_folder is None:
             try:
-                return self.fetch_emails(folder=folder, max_results=max_results)
-            except:
-                continue
+                self._sent_folder = self._find_sent_folder()
+            except Exception as e:
+                print(f"❌ Error listing folders: {e}")
+                return []
         
-        print("⚠️  Could not find sent folder")
-        return []
+        if not self._sent_folder:
+            print("⚠️  Could not find sent folder")
+            return []
+        
+        return self.fetch_emails(folder=self._sent_folder, max_results=max_results)
+    
+    def _find_sent_folder(self) -> str:
+        """Quoted name of the sent folder, or '' if there is none"""
+        mailboxes = self._list_mailboxes()
+        
+        # RFC 6154 special-use attribute, reported by Gmail, iCloud, Dovecot...
+        for attributes, name in mailboxes:
+            if '\\sent' in attributes.lower().split():
+                return _quote_mailbox(name)
+        
+        names = {name for _, name in mailboxes}
+        for candidate in self.SENT_FOLDERS:
+            if candidate in names:
+                return _quote_mailbox(candidate)
+        return ''
+    
+    def _list_mailboxes(self) -> List[tuple]:
+        """(attributes, name) for every folder, from one LIST command"""
+        _, folders = self.mail.list()
+        mailboxes = []
+        for folder in folders:
+            mailbox = _parse_list_response(folder)
+            if mailbox is not None:
+                mailboxes.append(mailbox)
+        return mailboxes
     
     def list_folders(self) -> List[str]:
         """List all available folders"""
@@ -338,14 +691,7 @@ class IMAPIngestor:
                 return []
         
         try:
-            _, folders = self.mail.list()
-            folder_names = []
-            for folder in folders:
-                # Parse folder name from IMAP response
-                parts = folder.decode().split('"')
-                if len(parts) >= 3:
-                    folder_names.append(parts[-2])
-            return folder_names
+            return [name for _, name in self._list_mailboxes()]
         except Exception as e:
             print(f"❌ Error listing folders: {e}")
             return []
@@ -359,12 +705,42 @@ class IMAPIngestor:
                 print("✅ Disconnected from IMAP server")
             except:
                 pass
+            shutdown_parse_pool()
     
     def __del__(self):
         """Cleanup on deletion"""
         self.disconnect()
 
 
+def fetch_from_accounts(ingestors: List[IMAPIngestor],
+                        max_workers: int = 5,
+                        **fetch_kwargs) -> List[Email]:
+    """
+    Fetch from several IMAP accounts (or folders) concurrently
+    
+    Each ingestor owns its own IMAP connection and is only ever used by one
+    worker, so connections are never shared between threads.
+    
+    Args:
+        ingestors: One IMAPIngestor per account
+        max_workers: Concurrent connections
+        **fetch_kwargs: Passed to each fetch_emails call
+    
+    Returns:
+        Emails from all accounts, newest first
+    """
+    if not ingestors:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ingestors))) as executor:
+        futures = [executor.submit(ingestor.fetch_emails, **fetch_kwargs)
+                   for ingestor in ingestors]
+        emails = [email_obj for future in futures for email_obj in future.result()]
+    
+    # timestamp() orders naive (fallback) and aware header dates together
+    return sorted(emails, key=lambda e: e.received_at.timestamp(), reverse=True)
+
+
 def get_provider_help():
     """Display help for setting up different email providers"""
     print("\n" + "="*70)
@@ -1,7 +1,9 @@
 """Mock email data generator for development and testing"""
 
 import random
+import uuid
 from datetime import datetime, timedelta
+from itertools import accumulate
 from typing import List
 from faker import Faker
 
@@ -11,11 +13,34 @@ from ..models import Email, EmailAddress, EmailThread, EmailCategory
 class MockEmailGenerator:
     """Generate realistic mock email data"""
     
+    # Faker pools hold 2**POOL_BITS entries, indexed with random.getrandbits
+    POOL_BITS = 9
+    AGE_POOL_BITS = 10
+    PARAGRAPH_POOL_SIZE = 64
+    
     def __init__(self, seed: int = 42):
         self.faker = Faker()
         Faker.seed(seed)
         random.seed(seed)
         
+        # Faker's provider dispatch is slow, so names, addresses and text are
+        # generated once and sampled per email
+        pool_size = 1 << self.POOL_BITS
+        self._address_pool = [
+            EmailAddress(email=self.faker.email(), name=self.faker.name())
+            for _ in range(pool_size)
+        ]
+        self._sentence_pool = [self.faker.sentence() for _ in range(pool_size)]
+        self._paragraph_pools = {}
+        
+        # Email ages (within last 30 days), reused instead of built per email
+        self._age_pool = [
+            timedelta(days=random.randint(0, 30),
+                      hours=random.randint(0, 23),
+                      minutes=random.randint(0, 59))
+            for _ in range(1 << self.AGE_POOL_BITS)
+        ]
+        
         # Pre-defined realistic email templates
         self.work_subjects = [
             "Q4 Project Status Update",
@@ -56,51 +81,47 @@ class MockEmailGenerator:
             "Flash Sale Ends Tonight",
             "Your Personalized Recommendations"
         ]
+        
+        self._subjects_by_category = {
+            EmailCategory.WORK: self.work_subjects,
+            EmailCategory.PERSONAL: self.personal_subjects,
+            EmailCategory.NEWSLETTER: self.newsletter_subjects,
+            EmailCategory.PROMOTIONAL: self.promotional_subjects,
+        }
+        
+        self._body_templates = self._build_body_templates()
+        self._default_body_templates = [lambda: self._paragraph(5)]
+        
+        # Cumulative weights for generate_batch, keyed by category distribution
+        self._weights_cache = {}
     
-    def generate_email(self, category: EmailCategory = None) -> Email:
-        """Generate a single mock email"""
+    def generate_email(self, category: EmailCategory = None,
+                       now: datetime = None) -> Email:
+        """Generate a single mock email, received up to 30 days before `now`"""
         
         if not category:
             category = random.choice(list(EmailCategory))
         
         # Generate email ID and thread ID
-        email_id = self.faker.uuid4()
-        thread_id = self.faker.uuid4()
+        email_id = self._uuid()
+        thread_id = self._uuid()
         
         # Select subject based on category
-        if category == EmailCategory.WORK:
-            subject = random.choice(self.work_subjects)
-        elif category == EmailCategory.PERSONAL:
-            subject = random.choice(self.personal_subjects)
-        elif category == EmailCategory.NEWSLETTER:
-            subject = random.choice(self.newsletter_subjects)
-        elif category == EmailCategory.PROMOTIONAL:
-            subject = random.choice(self.promotional_subjects)
+        subjects = self._subjects_by_category.get(category)
+        if subjects:
+            subject = random.choice(subjects)
         else:
-            subject = self.faker.sentence(nb_words=6)
+            subject = self._sentence()
         
         # Generate sender and recipients
-        sender = EmailAddress(
-            email=self.faker.email(),
-            name=self.faker.name()
-        )
-        
-        recipients = [
-            EmailAddress(
-                email=self.faker.email(),
-                name=self.faker.name()
-            )
-        ]
+        sender = self._address()
+        recipients = [self._address()]
         
         # Generate body text
         body_text = self._generate_email_body(category)
         
         # Generate received time (within last 30 days)
-        received_at = datetime.now() - timedelta(
-            days=random.randint(0, 30),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59)
-        )
+        received_at = (now or datetime.now()) - self._age_pool[random.getrandbits(self.AGE_POOL_BITS)]
         
         email = Email(
             id=email_id,
@@ -136,55 +157,72 @@ class MockEmailGenerator:
                 EmailCategory.SOCIAL: 0.05
             }
         
-        emails = []
-        for _ in range(count):
-            # Select category based on distribution
-            rand = random.random()
-            cumulative = 0
-            selected_category = EmailCategory.WORK
-            
-            for category, percentage in category_distribution.items():
-                cumulative += percentage
-                if rand <= cumulative:
-                    selected_category = category
-                    break
-            
-            email = self.generate_email(selected_category)
-            emails.append(email)
+        categories, cum_weights = self._get_category_weights(category_distribution)
+        
+        # Draw every category up front; the batch shares one clock reading
+        selected = random.choices(categories, cum_weights=cum_weights, k=count)
+        now = datetime.now()
         
-        return emails
+        return [self.generate_email(category, now) for category in selected]
+    
+    def _get_category_weights(self, category_distribution: dict) -> tuple:
+        """Cached (categories, cumulative weights) for a category distribution"""
+        key = tuple(category_distribution.items())
+        table = self._weights_cache.get(key)
+        if table is None:
+            # Percentages are consumed in order: anything past a cumulative
+            # 1.0 is unreachable and any shortfall below it falls to WORK
+            weights = {}
+            cumulative = 0.0
+            for category, percentage in key:
+                reached = min(cumulative + percentage, 1.0)
+                weights[category] = weights.get(category, 0.0) + max(reached - cumulative, 0.0)
+                cumulative = max(cumulative, reached)
+            if cumulative < 1.0:
+                weights[EmailCategory.WORK] = weights.get(EmailCategory.WORK, 0.0) + 1.0 - cumulative
+            
+            categories = [c for c, w in weights.items() if w > 0]
+            table = self._weights_cache[key] = (
+                categories, list(accumulate(weights[c] for c in categories))
+            )
+        return table
     
     def generate_thread(self, message_count: int = 50, 
                        category: EmailCategory = EmailCategory.WORK) -> EmailThread:
         """Generate a mock email thread with specified message count"""
         
-        thread_id = self.faker.uuid4()
+        thread_id = self._uuid()
         subject = random.choice(self.work_subjects)
+        reply_subject = f"Re: {subject}"
         
         # Generate participants (3-5 people)
-        participants = [
-            EmailAddress(email=self.faker.email(), name=self.faker.name())
-            for _ in range(random.randint(3, 5))
-        ]
+        participants = random.sample(self._address_pool, random.randint(3, 5))
+        # Everyone but the sender, built once per participant; the lists are
+        # shared between messages, which never mutate their recipients
+        recipients_by_sender = {
+            p.email: [q for q in participants if q.email != p.email]
+            for p in participants
+        }
         
         messages = []
-        base_time = datetime.now() - timedelta(days=30)
+        received_at = datetime.now() - timedelta(days=30)
         
         for i in range(message_count):
             sender = random.choice(participants)
-            recipients = [p for p in participants if p.email != sender.email]
+            recipients = recipients_by_sender[sender.email]
             
             # Add time variation (2-8 hours between messages)
-            time_offset = timedelta(hours=random.randint(2, 8) * i)
+            if i:
+                received_at += timedelta(hours=random.randint(2, 8))
             
             email = Email(
-                id=self.faker.uuid4(),
+                id=self._uuid(),
                 thread_id=thread_id,
-                subject=f"Re: {subject}" if i > 0 else subject,
+                subject=reply_subject if i else subject,
                 sender=sender,
                 recipients=recipients,
                 body_text=self._generate_email_body(category),
-                received_at=base_time + time_offset,
+                received_at=received_at,
                 in_reply_to=messages[-1].id if messages else None,
                 category=category
             )
@@ -199,40 +237,60 @@ class MockEmailGenerator:
         
         return thread
     
+    def _uuid(self) -> str:
+        """UUID4 string like Faker.uuid4(), drawn from the seeded RNG"""
+        return str(uuid.UUID(int=random.getrandbits(128), version=4))
+    
+    def _address(self) -> EmailAddress:
+        """Random contact from the pool; instances are shared, never mutated"""
+        return self._address_pool[random.getrandbits(self.POOL_BITS)]
+    
+    def _sentence(self) -> str:
+        """Random sentence from the pool"""
+        return self._sentence_pool[random.getrandbits(self.POOL_BITS)]
+    
+    def _paragraph(self, nb_sentences: int) -> str:
+        """Pooled faker.paragraph(nb_sentences=...), pool built on first use"""
+        pool = self._paragraph_pools.get(nb_sentences)
+        if pool is None:
+            pool = self._paragraph_pools[nb_sentences] = [
+                self.faker.paragraph(nb_sentences=nb_sentences)
+                for _ in range(self.PARAGRAPH_POOL_SIZE)
+            ]
+        return random.choice(pool)
+    
     def _generate_email_body(self, category: EmailCategory) -> str:
         """Generate realistic email content based on category"""
-        
-        if category == EmailCategory.WORK:
-            templates = [
-                f"Hi team,\n\n{self.faker.paragraph(nb_sentences=5)}\n\nCould you please review and provide feedback by end of day?\n\nBest regards,",
-                f"Hello,\n\n{self.faker.paragraph(nb_sentences=3)}\n\nLet me know if you have any questions.\n\nThanks,",
-                f"Quick update:\n\n{self.faker.paragraph(nb_sentences=4)}\n\nNext steps:\n- {self.faker.sentence()}\n- {self.faker.sentence()}\n\nPlease confirm.",
-            ]
-        elif category == EmailCategory.PERSONAL:
-            templates = [
-                f"Hey!\n\n{self.faker.paragraph(nb_sentences=3)}\n\nLet me know what you think!\n\nCheers,",
-                f"Hi there,\n\n{self.faker.paragraph(nb_sentences=2)}\n\nTalk soon!",
-                f"{self.faker.paragraph(nb_sentences=4)}\n\nTake care!"
-            ]
-        elif category == EmailCategory.NEWSLETTER:
-            templates = [
-                f"# Top Stories This Week\n\n{self.faker.paragraph(nb_sentences=6)}\n\n## Featured Article\n{self.faker.paragraph(nb_sentences=4)}\n\nUnsubscribe | Manage Preferences",
-                f"Your weekly digest:\n\n{self.faker.paragraph(nb_sentences=8)}\n\nRead more on our website\n\nTo unsubscribe, click here."
-            ]
-        elif category == EmailCategory.PROMOTIONAL:
-            templates = [
-                f"🎉 SPECIAL OFFER INSIDE! 🎉\n\n{self.faker.paragraph(nb_sentences=3)}\n\nUse code: SAVE50\n\nShop now: [link]\n\nUnsubscribe",
-                f"Don't miss out on this amazing deal!\n\n{self.faker.paragraph(nb_sentences=4)}\n\nLimited time only!\n\nUnsubscribe from promotional emails."
-            ]
-        elif category == EmailCategory.URGENT:
-            templates = [
-                f"URGENT: {self.faker.sentence()}\n\n{self.faker.paragraph(nb_sentences=3)}\n\nPlease address this ASAP.\n\nThanks,",
-                f"IMMEDIATE ACTION REQUIRED\n\n{self.faker.paragraph(nb_sentences=2)}\n\nDeadline: Today EOD\n\nPlease confirm receipt."
-            ]
-        else:
-            templates = [f"{self.faker.paragraph(nb_sentences=5)}"]
-        
-        return random.choice(templates)
+        templates = self._body_templates.get(category, self._default_body_templates)
+        return random.choice(templates)()
+    
+    def _build_body_templates(self) -> dict:
+        """Body templates per category, as callables so only the chosen one is filled"""
+        p, s = self._paragraph, self._sentence
+        return {
+            EmailCategory.WORK: [
+                lambda: f"Hi team,\n\n{p(5)}\n\nCould you please review and provide feedback by end of day?\n\nBest regards,",
+                lambda: f"Hello,\n\n{p(3)}\n\nLet me know if you have any questions.\n\nThanks,",
+                lambda: f"Quick update:\n\n{p(4)}\n\nNext steps:\n- {s()}\n- {s()}\n\nPlease confirm.",
+            ],
+            EmailCategory.PERSONAL: [
+                lambda: f"Hey!\n\n{p(3)}\n\nLet me know what you think!\n\nCheers,",
+                lambda: f"Hi there,\n\n{p(2)}\n\nTalk soon!",
+                lambda: f"{p(4)}\n\nTake care!"
+            ],
+            EmailCategory.NEWSLETTER: [
+                lambda: f"# Top Stories This Week\n\n{p(6)}\n\n## Featured Article\n{p(4)}\n\nUnsubscribe | Manage Preferences",
+                lambda: f"Your weekly digest:\n\n{p(8)}\n\nRead more on our website\n\nTo unsubscribe, click here."
+            ],
+            EmailCategory.PROMOTIONAL: [
+                lambda: f"🎉 SPECIAL OFFER INSIDE! 🎉\n\n{p(3)}\n\nUse code: SAVE50\n\nShop now: [link]\n\nUnsubscribe",
+                lambda: f"Don't miss out on this amazing deal!\n\n{p(4)}\n\nLimited time only!\n\nUnsubscribe from promotional emails."
+            ],
+            EmailCategory.URGENT: [
+                lambda: f"URGENT: {s()}\n\n{p(3)}\n\nPlease address this ASAP.\n\nThanks,",
+                lambda: f"IMMEDIATE ACTION REQUIRED\n\n{p(2)}\n\nDeadline: Today EOD\n\nPlease confirm receipt."
+            ],
+        }
     
     def generate_realistic_inbox(self, total_emails: int = 200) -> dict:
         """
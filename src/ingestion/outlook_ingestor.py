@@ -4,6 +4,7 @@ Connects to Microsoft Graph API to fetch real emails
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Optional
 from datetime import datetime
 
@@ -15,6 +16,7 @@ except ImportError:
     print("⚠️ Microsoft authentication library not installed. Run: pip install msal")
 
 from ..models import Email, EmailAddress, EmailCategory
+from .html_text import html_to_text
 
 
 class OutlookIngestor:
@@ -27,6 +29,11 @@ class OutlookIngestor:
     # Required scopes
     SCOPES = ['Mail.Read', 'Mail.ReadWrite', 'User.Read']
     
+    # Only the message properties _parse_outlook_message reads
+    MESSAGE_FIELDS = ('id,subject,from,toRecipients,body,receivedDateTime,'
+                      'conversationId,importance,categories,isRead')
+    HTTP_TIMEOUT = 30
+    
     def __init__(self, client_id: str, client_secret: Optional[str] = None):
         """
         Initialize Outlook ingestor
@@ -42,6 +49,10 @@ class OutlookIngestor:
         self.client_secret = client_secret
         self.access_token = None
         
+        # One pooled keep-alive session for every Graph request (and page)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=16))
+        
         # Initialize MSAL app
         if client_secret:
             # Confidential client (server app)
@@ -114,7 +125,8 @@ class OutlookIngestor:
         # Add query parameters
         params = {
             '$top': max_results,
-            '$orderby': 'receivedDateTime DESC'
+            '$orderby': 'receivedDateTime DESC',
+            '$select': self.MESSAGE_FIELDS
         }
         
         if filter_query:
@@ -127,18 +139,25 @@ class OutlookIngestor:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            messages = data.get('value', [])
+            # Graph pages large results; follow @odata.nextLink (which
+            # already carries the query) until max_results are read
+            messages = []
+            while url and len(messages) < max_results:
+                response = self.session.get(url, headers=headers, params=params,
+                                            timeout=self.HTTP_TIMEOUT)
+                response.raise_for_status()
+                
+                data = response.json()
+                messages.extend(data.get('value', []))
+                url = data.get('@odata.nextLink')
+                params = None
             
             if not messages:
                 print('No messages found.')
                 return []
             
             emails = []
-            for msg in messages:
+            for msg in messages[:max_results]:
                 email = self._parse_outlook_message(msg)
                 if email:
                     emails.append(email)
@@ -176,12 +195,12 @@ class OutlookIngestor:
             
             # Strip HTML if needed
             if message.get('body', {}).get('contentType') == 'html':
-                import re
-                body_text = re.sub('<[^<]+?>', '', body_text)
+                body_text = html_to_text(body_text)
             
             # Parse date
             received_str = message.get('receivedDateTime', '')
-            received_at = datetime.fromisoformat(received_str.replace('Z', '+00:00'))
+            # fromisoformat (C, Python 3.11+) takes Graph's trailing 'Z' as is
+            received_at = datetime.fromisoformat(received_str)
             
             # Get thread/conversation ID
             thread_id = message.get('conversationId', '')
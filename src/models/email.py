@@ -3,10 +3,10 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from enum import Enum
+from enum import IntEnum, StrEnum
 
 
-class EmailCategory(Enum):
+class EmailCategory(StrEnum):
     URGENT = "urgent"
     WORK = "work"
     PERSONAL = "personal"
@@ -16,7 +16,7 @@ class EmailCategory(Enum):
     SOCIAL = "social"
 
 
-class Priority(Enum):
+class Priority(IntEnum):
     CRITICAL = 5  # Respond within 1 hour
     HIGH = 4      # Respond same day
     MEDIUM = 3    # Respond within 2 days
@@ -24,25 +24,41 @@ class Priority(Enum):
     MINIMAL = 1   # No response needed
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EmailAddress:
     email: str
     name: Optional[str] = None
     domain: Optional[str] = None
     
+    # Lowercased address for case-insensitive lookups, computed once
+    email_lower: str = field(default='', init=False, repr=False, compare=False)
+    
+    # Fields of the to_dict() result; frozen, so it cannot go stale
+    _dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
-        if not self.domain and '@' in self.email:
-            self.domain = self.email.split('@')[1]
+        if not self.domain:
+            # Domain follows the last '@'; no list built as with split()
+            _, at, domain = self.email.rpartition('@')
+            if at:
+                object.__setattr__(self, 'domain', domain)
+        object.__setattr__(self, 'email_lower', self.email.lower())
     
     def to_dict(self):
-        return {
-            'email': self.email,
-            'name': self.name,
-            'domain': self.domain
-        }
+        d = self._dict
+        if d is None:
+            d = {
+                'email': self.email,
+                'name': self.name,
+                'domain': self.domain
+            }
+            object.__setattr__(self, '_dict', d)
+        # A copy: the address is shared by many emails, so callers must not
+        # be able to edit the cached one
+        return dict(d)
 
 
-@dataclass
+@dataclass(slots=True)
 class Attachment:
     filename: str
     content_type: str
@@ -58,7 +74,7 @@ class Attachment:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Email:
     """Core email message model"""
     id: str
@@ -99,6 +115,34 @@ class Email:
     # Raw source
     raw_data: Dict[str, Any] = field(default_factory=dict)
     
+    # received_at_iso cache (a slot: slotted classes have no __dict__ for cached_property)
+    _received_at_iso: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    # Lowercased subject/body caches shared by the triage keyword scans
+    _subject_lower: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _body_lower: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def received_at_iso(self) -> str:
+        """received_at in ISO 8601, formatted once per message"""
+        if self._received_at_iso is None:
+            self._received_at_iso = self.received_at.isoformat()
+        return self._received_at_iso
+    
+    @property
+    def subject_lower(self) -> str:
+        """subject, lowercased once per message"""
+        if self._subject_lower is None:
+            self._subject_lower = self.subject.lower()
+        return self._subject_lower
+    
+    @property
+    def body_lower(self) -> str:
+        """body_text, lowercased once per message"""
+        if self._body_lower is None:
+            self._body_lower = self.body_text.lower()
+        return self._body_lower
+    
     def to_dict(self):
         """Convert to dictionary for serialization"""
         return {
@@ -111,7 +155,7 @@ class Email:
             'bcc': [b.to_dict() for b in self.bcc],
             'body_text': self.body_text,
             'body_html': self.body_html,
-            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'received_at': self.received_at_iso if self.received_at else None,
             'sent_at': self.sent_at.isoformat() if self.sent_at else None,
             'attachments': [a.to_dict() for a in self.attachments],
             'in_reply_to': self.in_reply_to,
@@ -1,12 +1,13 @@
 """Email thread data model"""
 
+from bisect import insort
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from .email import Email, EmailAddress, EmailCategory, Priority
 
 
-@dataclass
+@dataclass(slots=True)
 class EmailThread:
     """Email conversation thread with 50+ message support"""
     thread_id: str
@@ -38,28 +39,44 @@ class EmailThread:
     def __post_init__(self):
         self.message_count = len(self.messages)
         if self.messages:
-            self.messages.sort(key=lambda m: m.received_at)
+            # Messages usually arrive in order already: one linear check
+            # instead of an unconditional sort
+            times = [m.received_at for m in self.messages]
+            if any(a > b for a, b in zip(times, times[1:])):
+                self.messages.sort(key=lambda m: m.received_at)
             self.first_message_at = self.messages[0].received_at
             self.last_message_at = self.messages[-1].received_at
     
     def add_message(self, message: Email):
         """Add message and maintain thread integrity"""
-        self.messages.append(message)
+        # Appends when in order; a late-arriving message is slotted into place
+        insort(self.messages, message, key=lambda m: m.received_at)
         self.message_count = len(self.messages)
-        self.last_message_at = message.received_at
-        if not self.first_message_at:
-            self.first_message_at = message.received_at
+        self.first_message_at = self.messages[0].received_at
+        self.last_message_at = self.messages[-1].received_at
     
     def get_total_text(self) -> str:
         """Get full thread text for processing"""
-        return "\n\n---\n\n".join([
-            f"From: {m.sender.email}\nDate: {m.received_at}\n\n{m.body_text}"
+        parts = []
+        for m in self.messages:
+            # str(datetime) is isoformat(' '): reuse the per-message ISO cache
+            parts += ("From: ", m.sender.email, "\nDate: ", m.received_at_iso.replace('T', ' ', 1),
+                      "\n\n", m.body_text, "\n\n---\n\n")
+        return ''.join(parts[:-1])
+    
+    def get_total_text_length(self) -> int:
+        """Length of get_total_text() without building the joined string"""
+        if not self.messages:
+            return 0
+        # "From: " + "\nDate: " + "\n\n" per message, "\n\n---\n\n" between messages
+        return sum(
+            15 + len(m.sender.email) + len(m.received_at_iso) + len(m.body_text)
             for m in self.messages
-        ])
+        ) + 7 * (len(self.messages) - 1)
     
-    def to_dict(self):
+    def to_dict(self, include_messages: bool = True):
         """Convert to dictionary for serialization"""
-        return {
+        data = {
             'thread_id': self.thread_id,
             'subject': self.subject,
             'participants': [p.to_dict() for p in self.participants],
@@ -76,5 +93,7 @@ class EmailThread:
             'timeline': self.timeline,
             'category': self.category.value if self.category else None,
             'priority_level': self.priority_level.name if self.priority_level else None,
-            'messages': [m.to_dict() for m in self.messages]
         }
+        if include_messages:
+            data['messages'] = [m.to_dict() for m in self.messages]
+        return data
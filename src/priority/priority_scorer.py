@@ -2,12 +2,102 @@
 
 import re
 from datetime import datetime, timedelta
-from typing import Optional, Dict
-from dateutil import parser
+from types import MappingProxyType
+from typing import Optional, Dict, List, Mapping, Sequence
 
 from ..models import Email, EmailThread, EmailCategory, Priority
 
 
+# Month and weekday names as dateutil's parser recognises them
+_MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'),
+        ('dec', 'december')
+    ), 1)
+    for name in names
+}
+_WEEKDAYS = frozenset([
+    'mon', 'monday', 'tue', 'tuesday', 'wed', 'wednesday', 'thu', 'thursday',
+    'fri', 'friday', 'sat', 'saturday', 'sun', 'sunday'
+])
+
+
+def _today() -> datetime:
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _parse_dmy(match) -> Optional[datetime]:
+    """M/D/Y or M-D-Y; None when dateutil's day-first/odd-year rules apply"""
+    month, day, year = match.group(2, 3, 4)
+    month, day = int(month), int(day)
+    if month > 12:
+        return None
+    if len(year) == 4:
+        year = int(year)
+    elif len(year) == 2:
+        # Two-digit years land within 50 years of now, as in dateutil
+        this_year = datetime.now().year
+        year = int(year) + this_year // 100 * 100
+        if year >= this_year + 50:
+            year -= 100
+        elif year < this_year - 50:
+            year += 100
+    else:
+        return None
+    return datetime(year, month, day)
+
+
+def _parse_month_day(match) -> Optional[datetime]:
+    """"<month|weekday> <day>[st|nd|rd|th]" in the current year"""
+    word = match.group(2).lower()
+    day = int(match.group(3))
+    if word in _MONTHS:
+        return _today().replace(month=_MONTHS[word], day=day)
+    if word in _WEEKDAYS:
+        # An explicit day wins over the weekday
+        return _today().replace(day=day)
+    return None
+
+
+def _parse_time(match) -> Optional[datetime]:
+    """"H:MM am/pm" today"""
+    hour, minute = int(match.group(2)), int(match.group(3))
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if match.group(4).lower() == 'p':
+        hour = hour % 12 + 12
+    else:
+        hour %= 12
+    return _today().replace(hour=hour, minute=minute)
+
+
+# Literal every deadline pattern needs, checked on the lowercased text
+# before running the regexes. 'deadl' rather than 'deadline': IGNORECASE
+# matches dotted/dotless i, which lower() would not map to 'i'.
+_DEADLINE_TRIGGERS = ('deadl', 'due', 'by', 'before')
+
+
+def _dateutil_parse(text: str) -> datetime:
+    # dateutil's parser is slow to import and call, so it is only loaded
+    # for values the narrow parsers above do not handle
+    from dateutil import parser
+    return parser.parse(text)
+
+
+# Common deadline phrases, compiled once instead of per email, each with a
+# parser for the narrow format it captures. Group 1 is the whole value;
+# anything the parser declines falls back to dateutil.
+_DEADLINE_PATTERNS = tuple((re.compile(p, re.IGNORECASE), parse) for p, parse in (
+    (r'deadline:?\s*((\d{1,2})[/-](\d{1,2})[/-](\d{2,4}))', _parse_dmy),
+    (r'due:?\s*((\d{1,2})[/-](\d{1,2})[/-](\d{2,4}))', _parse_dmy),
+    (r'by\s+((\w+)\s+(\d{1,2})(?:st|nd|rd|th)?)', _parse_month_day),
+    (r'before\s+((\d{1,2}):(\d{2})\s*([ap])m)', _parse_time),
+))
+
+
 class PriorityScorer:
     """
     Calculate email priority using weighted factors:
@@ -52,25 +142,43 @@ class PriorityScorer:
             'time sensitive': 8
         }
     
-    def calculate_priority(self, email: Email, thread: Optional[EmailThread] = None) -> float:
+    @property
+    def urgent_keywords(self) -> Mapping[str, float]:
+        """
+        Urgent keyword -> weight (0-10), read-only
+        
+        Change weights with add_urgent_keyword or by assigning a new mapping,
+        so the scan order used by _score_keyword_urgency stays in sync.
+        """
+        return self._urgent_keywords_view
+    
+    @urgent_keywords.setter
+    def urgent_keywords(self, keywords: Mapping[str, float]):
+        self._urgent_keywords = dict(keywords)
+        self._urgent_keywords_view = MappingProxyType(self._urgent_keywords)
+        self._keyword_order = self._sort_keywords()
+    
+    def calculate_priority(self, email: Email, thread: Optional[EmailThread] = None,
+                           now: Optional[datetime] = None,
+                           text_lower: Optional[str] = None) -> float:
         """
         Calculate priority score (0-100)
+        
+        `now` is the reference time for the deadline, thread and recency
+        factors; it defaults to the current time. `text_lower` is the
+        lowercased "subject body" text, if the caller already has it.
         """
-        scores = {
-            'sender': self._score_sender_importance(email),
-            'keywords': self._score_keyword_urgency(email),
-            'deadline': self._score_deadline_proximity(email),
-            'thread': self._score_thread_context(email, thread),
-            'recency': self._score_recency(email)
-        }
+        if now is None:
+            now = datetime.now()
+        weights = self.weights
         
         # Weighted sum
         total_score = (
-            scores['sender'] * self.weights['sender_importance'] +
-            scores['keywords'] * self.weights['keyword_urgency'] +
-            scores['deadline'] * self.weights['deadline_proximity'] +
-            scores['thread'] * self.weights['thread_context'] +
-            scores['recency'] * self.weights['recency']
+            self._score_sender_importance(email) * weights['sender_importance'] +
+            self._score_keyword_urgency(email, text_lower) * weights['keyword_urgency'] +
+            self._score_deadline_proximity(email, now) * weights['deadline_proximity'] +
+            self._score_thread_context(email, thread, now) * weights['thread_context'] +
+            self._score_recency(email, now) * weights['recency']
         )
         
         # Boost for explicit urgency flags
@@ -79,9 +187,25 @@ class PriorityScorer:
         
         return round(total_score, 2)
     
+    def score_batch(self, emails: Sequence[Email],
+                    threads: Optional[Sequence[Optional[EmailThread]]] = None) -> List[float]:
+        """
+        Calculate priority scores for a batch of emails
+        
+        The whole batch is scored against a single reference time, so
+        emails are ranked consistently and the clock is read once.
+        """
+        now = datetime.now()
+        if threads is None:
+            return [self.calculate_priority(email, None, now) for email in emails]
+        return [
+            self.calculate_priority(email, thread, now)
+            for email, thread in zip(emails, threads)
+        ]
+    
     def _score_sender_importance(self, email: Email) -> float:
         """Score based on sender (0-100)"""
-        sender_email = email.sender.email.lower()
+        sender_email = email.sender.email_lower
         
         # Check VIP list
         if sender_email in self.vip_senders:
@@ -97,19 +221,18 @@ class PriorityScorer:
         # External but known contacts
         return 40
     
-    def _score_keyword_urgency(self, email: Email) -> float:
+    def _score_keyword_urgency(self, email: Email, text_lower: Optional[str] = None) -> float:
         """Score based on urgent keywords (0-100)"""
-        text = (email.subject + " " + email.body_text).lower()
+        text = text_lower if text_lower is not None else email.subject_lower + " " + email.body_lower
         
-        max_score = 0
-        for keyword, score in self.urgent_keywords.items():
+        for keyword, score in self._keyword_order:
             if keyword in text:
-                max_score = max(max_score, score)
+                # Normalize to 0-100
+                return score * 10
         
-        # Normalize to 0-100
-        return max_score * 10
+        return 0
     
-    def _score_deadline_proximity(self, email: Email) -> float:
+    def _score_deadline_proximity(self, email: Email, now: Optional[datetime] = None) -> float:
         """Score based on deadline proximity (0-100)"""
         # Extract deadline from email
         deadline = self._extract_deadline(email)
@@ -117,7 +240,7 @@ class PriorityScorer:
         if not deadline:
             return 30  # Default moderate score
         
-        time_until_deadline = (deadline - datetime.now()).total_seconds() / 3600  # hours
+        time_until_deadline = (deadline - (now or datetime.now())).total_seconds() / 3600  # hours
         
         if time_until_deadline < 0:
             return 100  # Past deadline - critical
@@ -132,7 +255,8 @@ class PriorityScorer:
         else:
             return 20  # > 1 week
     
-    def _score_thread_context(self, email: Email, thread: Optional[EmailThread]) -> float:
+    def _score_thread_context(self, email: Email, thread: Optional[EmailThread],
+                              now: Optional[datetime] = None) -> float:
         """Score based on thread activity (0-100)"""
         if not thread or thread.message_count <= 1:
             return 50  # New thread, moderate importance
@@ -142,7 +266,7 @@ class PriorityScorer:
         
         # Recent activity boost
         if thread.last_message_at:
-            hours_since_last = (datetime.now() - thread.last_message_at).total_seconds() / 3600
+            hours_since_last = ((now or datetime.now()) - thread.last_message_at).total_seconds() / 3600
             if hours_since_last < 2:
                 activity_score += 30
             elif hours_since_last < 24:
@@ -150,9 +274,9 @@ class PriorityScorer:
         
         return min(activity_score, 100)
     
-    def _score_recency(self, email: Email) -> float:
+    def _score_recency(self, email: Email, now: Optional[datetime] = None) -> float:
         """Score based on how recent the email is (0-100)"""
-        age_hours = (datetime.now() - email.received_at).total_seconds() / 3600
+        age_hours = ((now or datetime.now()) - email.received_at).total_seconds() / 3600
         
         if age_hours < 1:
             return 100
@@ -167,21 +291,24 @@ class PriorityScorer:
     
     def _extract_deadline(self, email: Email) -> Optional[datetime]:
         """Extract deadline from email text using pattern matching"""
+        subject_lower, body_lower = email.subject_lower, email.body_lower
+        if not any(t in subject_lower or t in body_lower for t in _DEADLINE_TRIGGERS):
+            return None
+        
         text = email.subject + " " + email.body_text
         
         # Pattern matching for common deadline phrases
-        patterns = [
-            r'deadline:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'due:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'by\s+(\w+\s+\d{1,2}(?:st|nd|rd|th)?)',
-            r'before\s+(\d{1,2}:\d{2}\s*[ap]m)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, parse in _DEADLINE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
-                    return parser.parse(match.group(1))
+                    deadline = parse(match)
+                except ValueError:
+                    deadline = None
+                if deadline is not None:
+                    return deadline
+                try:
+                    return _dateutil_parse(match.group(1))
                 except Exception:
                     pass
         
@@ -207,3 +334,12 @@ class PriorityScorer:
     def add_work_domain(self, domain: str):
         """Add work domain"""
         self.work_domains.add(domain.lower())
+    
+    def add_urgent_keyword(self, keyword: str, weight: float):
+        """Add or reweight an urgent keyword (weight 0-10)"""
+        self._urgent_keywords[keyword.lower()] = weight
+        self._keyword_order = self._sort_keywords()
+    
+    def _sort_keywords(self) -> tuple:
+        """Keywords by descending weight, so the first hit is the maximum"""
+        return tuple(sorted(self._urgent_keywords.items(), key=lambda kv: kv[1], reverse=True))
@@ -1,60 +1,117 @@
 """Rule-based email classification"""
 
 import re
-from typing import Tuple, Set
+from dataclasses import dataclass
+from typing import Tuple, Set, FrozenSet, Optional, Pattern
 from ..models import Email, EmailCategory
 
 
+_PERCENT_OFF_RE = re.compile(r'\d+%\s+off', re.IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
+class Ruleset:
+    """
+    Trigger data for one category
+    
+    Each non-empty field is one rule; the category's confidence is the
+    fraction of its rules that match.
+    """
+    subject_words: Tuple[str, ...] = ()   # substrings of the lowercased subject
+    subject_marks: Tuple[str, ...] = ()   # case-sensitive substrings of the subject
+    body_words: Tuple[str, ...] = ()      # substrings of the lowercased body
+    marks: Tuple[str, ...] = ()           # case-sensitive, in subject or body
+    body_pattern: Optional[Pattern] = None
+    domains: FrozenSet[str] = frozenset()
+    noreply_sender: bool = False          # named sender with a noreply address
+    
+    @property
+    def rule_count(self) -> int:
+        return sum(map(bool, (
+            self.subject_words, self.subject_marks, self.body_words, self.marks,
+            self.body_pattern, self.domains, self.noreply_sender
+        )))
+    
+    def match_count(self, email: Email, subject_lower: str, body_lower: str) -> int:
+        """Number of this category's rules matching the email"""
+        subject = email.subject
+        matches = 0
+        if self.subject_words and any(w in subject_lower for w in self.subject_words):
+            matches += 1
+        if self.subject_marks and any(m in subject for m in self.subject_marks):
+            matches += 1
+        if self.body_words and any(w in body_lower for w in self.body_words):
+            matches += 1
+        if self.marks and any(m in subject or m in email.body_text for m in self.marks):
+            matches += 1
+        if self.body_pattern is not None and self.body_pattern.search(email.body_text):
+            matches += 1
+        if self.domains and email.sender.domain in self.domains:
+            matches += 1
+        if self.noreply_sender and email.sender.name and 'noreply' in email.sender.email.lower():
+            matches += 1
+        return matches
+
+
+# Default rules, checked in order; the first category with any matching
+# rule wins. Rulesets are immutable, so classifiers share them.
+_DEFAULT_RULESETS = {
+    EmailCategory.SPAM: Ruleset(
+        subject_words=('viagra', 'casino', 'lottery', 'prince', 'inheritance', 'bitcoin wallet'),
+        domains=frozenset(['suspicious.com', 'spam-domain.net'])
+    ),
+    EmailCategory.NEWSLETTER: Ruleset(
+        subject_words=('newsletter', 'digest', 'weekly update', 'monthly summary'),
+        body_words=('unsubscribe',),
+        noreply_sender=True
+    ),
+    EmailCategory.PROMOTIONAL: Ruleset(
+        subject_words=('sale', 'discount', 'offer', 'deal', 'promo', '% off', '50%'),
+        body_pattern=_PERCENT_OFF_RE,
+        subject_marks=('🎉', '💰', '🛍️')
+    ),
+    EmailCategory.URGENT: Ruleset(
+        subject_words=('urgent', 'asap', 'immediate', 'critical', 'emergency'),
+        marks=('!!!',),
+        subject_marks=('URGENT', 'IMMEDIATE ACTION')
+    ),
+    EmailCategory.SOCIAL: Ruleset(
+        domains=frozenset(['facebook.com', 'twitter.com', 'linkedin.com',
+                           'instagram.com', 'tiktok.com']),
+        subject_words=('tagged you', 'mentioned you', 'sent you a message', 'friend request')
+    )
+}
+
+
 class RuleBasedClassifier:
     """Fast, deterministic email classification using rules"""
     
     def __init__(self):
-        self.rules = {
-            EmailCategory.SPAM: [
-                lambda e: any(word in e.subject.lower() for word in 
-                    ['viagra', 'casino', 'lottery', 'prince', 'inheritance', 'bitcoin wallet']),
-                lambda e: e.sender.domain in ['suspicious.com', 'spam-domain.net']
-            ],
-            EmailCategory.NEWSLETTER: [
-                lambda e: any(word in e.subject.lower() for word in 
-                    ['newsletter', 'digest', 'weekly update', 'monthly summary']),
-                lambda e: 'unsubscribe' in e.body_text.lower(),
-                lambda e: e.sender.name and 'noreply' in e.sender.email.lower()
-            ],
-            EmailCategory.PROMOTIONAL: [
-                lambda e: any(word in e.subject.lower() for word in 
-                    ['sale', 'discount', 'offer', 'deal', 'promo', '% off', '50%']),
-                lambda e: re.search(r'\d+%\s+off', e.body_text, re.IGNORECASE) is not None,
-                lambda e: any(emoji in e.subject for emoji in ['🎉', '💰', '🛍️'])
-            ],
-            EmailCategory.URGENT: [
-                lambda e: any(word in e.subject.lower() for word in 
-                    ['urgent', 'asap', 'immediate', 'critical', 'emergency']),
-                lambda e: '!!!' in e.subject or '!!!' in e.body_text,
-                lambda e: 'URGENT' in e.subject or 'IMMEDIATE ACTION' in e.subject
-            ],
-            EmailCategory.SOCIAL: [
-                lambda e: e.sender.domain in ['facebook.com', 'twitter.com', 'linkedin.com', 
-                                               'instagram.com', 'tiktok.com'],
-                lambda e: any(phrase in e.subject.lower() for phrase in 
-                    ['tagged you', 'mentioned you', 'sent you a message', 'friend request'])
-            ]
-        }
+        # Per-instance mapping, so categories can be added or replaced
+        self.rulesets = dict(_DEFAULT_RULESETS)
         
         # Domain-based classification (user-configurable)
         self.work_domains: Set[str] = set()
         self.personal_contacts: Set[str] = set()
     
-    def classify(self, email: Email) -> Tuple[EmailCategory, float]:
+    def classify(self, email: Email, subject_lower: Optional[str] = None,
+                 body_lower: Optional[str] = None) -> Tuple[EmailCategory, float]:
         """
         Returns (category, confidence)
         Confidence: 0.0 to 1.0
+        
+        Callers that already lowercased the subject/body can pass them in.
         """
+        if subject_lower is None:
+            subject_lower = email.subject_lower
+        if body_lower is None:
+            body_lower = email.body_lower
+        
         # Check rules in priority order
-        for category, rule_list in self.rules.items():
-            matches = sum(1 for rule in rule_list if self._safe_eval(rule, email))
+        for category, ruleset in self.rulesets.items():
+            matches = ruleset.match_count(email, subject_lower, body_lower)
             if matches > 0:
-                confidence = min(matches / len(rule_list), 1.0)
+                confidence = min(matches / ruleset.rule_count, 1.0)
                 return category, confidence
         
         # Domain-based work/personal classification
@@ -67,13 +124,6 @@ class RuleBasedClassifier:
         # Default to work if uncertain
         return EmailCategory.WORK, 0.3
     
-    def _safe_eval(self, rule_func, email: Email) -> bool:
-        """Safely evaluate rule function"""
-        try:
-            return rule_func(email)
-        except Exception:
-            return False
-    
     def add_work_domain(self, domain: str):
         """Configure work domain for classification"""
         self.work_domains.add(domain.lower())
@@ -1,10 +1,38 @@
 """Triage agent orchestrating classification"""
 
-from typing import Optional
+from typing import Optional, List, Sequence
 from ..models import Email, EmailCategory
 from .rule_classifier import RuleBasedClassifier
 
 
+# Newsletters and promotional emails don't need responses
+_NO_RESPONSE_CATEGORIES = frozenset([
+    EmailCategory.NEWSLETTER, EmailCategory.PROMOTIONAL, EmailCategory.SPAM
+])
+
+# Intent keywords, matched against the lowercased subject and body
+_MEETING_WORDS = ('meeting', 'schedule', 'call', 'zoom', 'teams')
+_UNSUBSCRIBE_WORDS = ('unsubscribe', 'remove me', 'opt out')
+_STATUS_WORDS = ('update', 'status', 'progress')
+_REVIEW_WORDS = ('review', 'feedback', 'approve')
+
+# Response-requesting phrases, matched against the lowercased body
+_EXPECTING_PHRASES = (
+    'please let me know',
+    'can you',
+    'could you',
+    'would you',
+    'please confirm',
+    'please review',
+    'please send',
+    'waiting for',
+    'looking forward to hearing',
+    'please respond',
+    'please reply',
+    'asap'
+)
+
+
 class TriageAgent:
     """Orchestrates email classification using rule-based approach"""
     
@@ -15,62 +43,56 @@ class TriageAgent:
         """
         Classify email using rule-based approach
         """
+        # Lowercased once per message and shared by the keyword scans below
+        subject_lower = email.subject_lower
+        body_lower = email.body_lower
+        text_lower = subject_lower + " " + body_lower
+        
         # Rule-based classification
-        category, confidence = self.rule_classifier.classify(email)
+        category, confidence = self.rule_classifier.classify(email, subject_lower, body_lower)
         
         email.category = category
         
         # Set detected intent based on category
-        email.detected_intent = self._infer_intent(email)
+        email.detected_intent = self._infer_intent(email, text_lower)
         
         # Determine if response is required
-        email.requires_response = self._requires_response(email)
+        email.requires_response = self._requires_response(email, body_lower)
         
         return email
     
-    def _infer_intent(self, email: Email) -> Optional[str]:
+    def classify_batch(self, emails: Sequence[Email]) -> List[Email]:
+        """Classify a batch of emails in place and return them"""
+        classify_email = self.classify_email
+        return [classify_email(email) for email in emails]
+    
+    def _infer_intent(self, email: Email, text_lower: Optional[str] = None) -> Optional[str]:
         """Infer intent from email content"""
-        text = (email.subject + " " + email.body_text).lower()
+        text = text_lower if text_lower is not None else email.subject_lower + " " + email.body_lower
         
-        if any(word in text for word in ['meeting', 'schedule', 'call', 'zoom', 'teams']):
+        if any(word in text for word in _MEETING_WORDS):
             return 'schedule_meeting'
         elif '?' in text or 'question' in text:
             return 'request_info'
-        elif any(word in text for word in ['unsubscribe', 'remove me', 'opt out']):
+        elif any(word in text for word in _UNSUBSCRIBE_WORDS):
             return 'unsubscribe'
-        elif any(word in text for word in ['update', 'status', 'progress']):
+        elif any(word in text for word in _STATUS_WORDS):
             return 'status_update'
-        elif any(word in text for word in ['review', 'feedback', 'approve']):
+        elif any(word in text for word in _REVIEW_WORDS):
             return 'review_request'
         
         return None
     
-    def _requires_response(self, email: Email) -> bool:
+    def _requires_response(self, email: Email, body_lower: Optional[str] = None) -> bool:
         """Determine if email requires a response"""
-        # Newsletters and promotional emails don't need responses
-        if email.category in [EmailCategory.NEWSLETTER, EmailCategory.PROMOTIONAL, EmailCategory.SPAM]:
+        if email.category in _NO_RESPONSE_CATEGORIES:
             return False
         
-        text = email.body_text.lower()
-        
-        # Check for response-requesting phrases
-        expecting_phrases = [
-            'please let me know',
-            'can you',
-            'could you',
-            'would you',
-            'please confirm',
-            'please review',
-            'please send',
-            'waiting for',
-            'looking forward to hearing',
-            'please respond',
-            'please reply',
-            'asap'
-        ]
-        
         # Questions indicate expecting response
         if '?' in email.body_text:
             return True
         
-        return any(phrase in text for phrase in expecting_phrases)
+        text = body_lower if body_lower is not None else email.body_lower
+        
+        # Check for response-requesting phrases
+        return any(phrase in text for phrase in _EXPECTING_PHRASES)
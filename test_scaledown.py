@@ -15,6 +15,22 @@ from src.ingestion import MockEmailGenerator
 from src.compression import EmailThreadCompressor
 
 
+# One client for the whole run, so every test reuses its pooled
+# connections, worker threads and health probe
+_client = None
+
+
+def get_client() -> ScaleDownAPIClient:
+    """Return the shared ScaleDown client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = ScaleDownAPIClient(
+            api_key=Config.SCALEDOWN_API_KEY,
+            base_url=Config.SCALEDOWN_BASE_URL
+        )
+    return _client
+
+
 def print_separator(title):
     """Print a formatted section separator"""
     print("\n" + "=" * 70)
@@ -52,10 +68,7 @@ def test_api_health():
         print("⏭️  Skipping (API not configured)")
         return False
     
-    client = ScaleDownAPIClient(
-        api_key=Config.SCALEDOWN_API_KEY,
-        base_url=Config.SCALEDOWN_BASE_URL
-    )
+    client = get_client()
     
     print("Checking API health...")
     is_healthy = client.health_check()
@@ -86,12 +99,7 @@ def test_thread_compression():
     print(f"Participants: {len(thread.participants)}")
     
     # Initialize hybrid compressor
-    client = None
-    if Config.is_scaledown_configured():
-        client = ScaleDownAPIClient(
-            api_key=Config.SCALEDOWN_API_KEY,
-            base_url=Config.SCALEDOWN_BASE_URL
-        )
+    client = get_client() if Config.is_scaledown_configured() else None
     
     local_compressor = EmailThreadCompressor()
     hybrid_compressor = HybridCompressor(
@@ -125,10 +133,7 @@ def test_email_features():
         print("⏭️  Skipping (API not configured)")
         return
     
-    client = ScaleDownAPIClient(
-        api_key=Config.SCALEDOWN_API_KEY,
-        base_url=Config.SCALEDOWN_BASE_URL
-    )
+    client = get_client()
     
     # Generate test email
     generator = MockEmailGenerator()
@@ -140,10 +145,15 @@ def test_email_features():
     print(f"   Subject: {test_email.subject}")
     print(f"   Body preview: {test_email.body_text[:100]}...")
     
+    # The three calls are independent: issue them together on the client's pool
+    classify_future = client.executor.submit(client.classify_email, test_email)
+    entities_future = client.executor.submit(client.extract_entities, test_email.body_text)
+    sentiment_future = client.executor.submit(client.analyze_sentiment, test_email.body_text)
+    
     # Test classification
     print("\n🏷️  Testing classification...")
     try:
-        result = client.classify_email(test_email)
+        result = classify_future.result()
         if result.get('fallback'):
             print("   ⚠️  API not available, would use local classification")
         else:
@@ -155,7 +165,7 @@ def test_email_features():
     # Test entity extraction
     print("\n🔍 Testing entity extraction...")
     try:
-        entities = client.extract_entities(test_email.body_text)
+        entities = entities_future.result()
         if entities:
             print(f"   Found {len(entities)} entities:")
             for entity in entities[:5]:
@@ -168,7 +178,7 @@ def test_email_features():
     # Test sentiment analysis
     print("\n😊 Testing sentiment analysis...")
     try:
-        sentiment = client.analyze_sentiment(test_email.body_text)
+        sentiment = sentiment_future.result()
         if sentiment.get('error'):
             print(f"   ⚠️  API error: {sentiment['error']}")
         else:
@@ -186,10 +196,7 @@ def test_batch_processing():
         print("⏭️  Skipping (API not configured)")
         return
     
-    client = ScaleDownAPIClient(
-        api_key=Config.SCALEDOWN_API_KEY,
-        base_url=Config.SCALEDOWN_BASE_URL
-    )
+    client = get_client()
     
     # Generate batch of emails
     print("Generating batch of 10 test emails...")
@@ -232,10 +239,13 @@ def main():
     test_email_features()
     test_batch_processing()
     
+    if _client is not None:
+        _client.close()
+    
     # Final summary
     print_separator("Test Summary")
     
-    if Config.is_scaledown_configured():
+    if configured:
         print("✅ ScaleDown AI is configured")
         print("\nYour system will:")
         print("   1. Try to use ScaleDown AI API for enhanced features")